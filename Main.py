@@ -1,50 +1,198 @@
-import subprocess
 import sys
 import os
 import re
+import io
+import codecs
+import math
+import heapq
+from collections import deque
+import xml.etree.ElementTree as ET
+import argparse
+import traceback
+import hashlib
+import json
+import shutil
+import time
+import contextlib
+import threading
+import tracemalloc
+import select
+import copy
+import gzip
+import struct
+import ctypes
+import ctypes.util
 
 # Función para instalar librerías si no están presentes
 def install(*packages):
+    import subprocess
     subprocess.check_call([sys.executable, "-m", "pip", "install", *packages])
 
-# Verifica si las librerías están instaladas e instálalas si no
-try:
-    import svgwrite
-except ImportError:
-    install('svgwrite')
-    import svgwrite
-
-try:
-    from reportlab.pdfgen import canvas
-    from reportlab.graphics import renderPDF
-    from reportlab.pdfbase.ttfonts import TTFont
-    from reportlab.pdfbase import pdfmetrics
-except ImportError:
-    install('reportlab')  # Paquetes separados
-    from reportlab.pdfgen import canvas
-    from reportlab.graphics import renderPDF
-    from reportlab.pdfbase.ttfonts import TTFont
-    from reportlab.pdfbase import pdfmetrics
-    import reportlab.rl_config
-    reportlab.rl_config.warnOnMissingFontGlyphs = 0
-
-try:
-    from svglib.svglib import svg2rlg
-except ImportError:
-    install('svglib')
-    from svglib.svglib import svg2rlg
+def load_dependencies(install_missing=False):
+    # Importa svgwrite, reportlab y svglib la primera vez que se necesitan, así importar este módulo
+    # no carga nada pesado. Desde la línea de comandos las librerías que falten se instalan con pip;
+    # usado como biblioteca, una librería faltante es un ImportError.
+    global dependencies_loaded
+    global svgwrite, canvas, renderPDF, Drawing, Group, pdfmetrics
+    global SvgRenderer, NodeTracker, Svg2RlgAttributeConverter, PX_TO_PT, clean_text, load_svg_file
+    global svg_converter
+    if dependencies_loaded:
+        return
+
+    # Verifica si las librerías están instaladas e instálalas si no
+    try:
+        import svgwrite
+    except ImportError:
+        if not install_missing:
+            raise
+        install('svgwrite')
+        import svgwrite
+
+    try:
+        from reportlab.pdfgen import canvas
+        from reportlab.graphics import renderPDF
+        from reportlab.graphics.shapes import Drawing, Group
+        from reportlab.pdfbase import pdfmetrics
+    except ImportError:
+        if not install_missing:
+            raise
+        install('reportlab')  # Paquetes separados
+        from reportlab.pdfgen import canvas
+        from reportlab.graphics import renderPDF
+        from reportlab.graphics.shapes import Drawing, Group
+        from reportlab.pdfbase import pdfmetrics
+        import reportlab.rl_config
+        reportlab.rl_config.warnOnMissingFontGlyphs = 0
+
+    try:
+        from svglib.svglib import SvgRenderer, NodeTracker, Svg2RlgAttributeConverter, PX_TO_PT, clean_text, load_svg_file
+    except ImportError:
+        if not install_missing:
+            raise
+        install('svglib')
+        from svglib.svglib import SvgRenderer, NodeTracker, Svg2RlgAttributeConverter, PX_TO_PT, clean_text, load_svg_file
+
+    svg_converter = Svg2RlgAttributeConverter()
+    define_skin_symbol_class()
+    define_svg_drawing_class()
+    define_skin_renderer_class()
+    dependencies_loaded = True
+
+
+dependencies_loaded = False
+# renderPM de reportlab, para las vistas previas png (ver load_rasterizer).
+renderPM = None
+
+
+def load_rasterizer(install_missing=False):
+    # Importa renderPM de reportlab la primera vez que se generan vistas previas. Desde reportlab 4 renderPM
+    # dibuja con el paquete rlPyCairo, que se instala aparte; las versiones anteriores traen su propio
+    # backend compilado.
+    global renderPM
+    if renderPM is not None:
+        return
+    load_dependencies(install_missing)
+
+    from reportlab import rl_config
+    if getattr(rl_config, 'renderPMBackend', '_renderPM') == 'rlPyCairo':
+        try:
+            import rlPyCairo
+        except ImportError:
+            if not install_missing:
+                raise
+            install('rlPyCairo')
+    from reportlab.graphics import renderPM as module
+    renderPM = module
 
 
 # Definiciones del texto.
-font = "LM Roman 10"
+# "font" es el nombre con el que se registra LM Roman 10 en reportlab y svglib, así los textos
+# se crean directamente con la fuente final.
+font = "LM_Roman_10"
 fontSize = "20px"
-font_path = os.path.join('fonts', 'lmroman10-regular.ttf')
+# Directorio raíz del programa: las skins y la fuente se buscan ahí aunque se use como biblioteca
+# desde otra carpeta.
+root_dir = os.path.dirname(os.path.abspath(__file__))
+font_path = os.path.join(root_dir, 'fonts', 'lmroman10-regular.ttf')
+
+# Carpeta de skins usada para dibujar los componentes.
+skins_dir = os.path.join(root_dir, 'Skins', 'Default')
+
+# Versión del conversor. Cambiarla invalida la caché de pdfs ya generados: hay que subirla con cada
+# cambio que modifique el dibujo (3: estilo de las líneas, nodos en T, cables unidos en polilíneas y
+# recorte al marco de la figura; 4: el título del pdf es solo el nombre del archivo; 5: cables colineales
+# superpuestos unidos, sin nodos en sus extremos).
+CONVERTER_VERSION = "5"
 
 
 minx = 0
 miny = 0
 
 
+class OrientationTransform:
+    # Una de las 8 orientaciones de LTspice (R0, R90, R180, R270 y sus espejadas M0...M270), con todo lo
+    # que depende de ella calculado una sola vez: la matriz de la skin, cómo se rotan y alinean los textos
+    # y las transformaciones svg. Ubicar un componente o un texto queda en buscar la orientación en
+    # "orientation_transforms" y aplicar la matriz.
+    def __init__(slf, orientation, flip):
+        slf.orientation = orientation
+        slf.flip = flip
+        slf.name = ("M" if flip == -1 else "R") + orientation[1:]
+        slf.angle = int(orientation[1:])
+        # Ángulo de los textos que siguen la rotación del componente (nunca quedan cabeza abajo).
+        slf.text_angle = slf.angle % 180
+
+        # Rotación de las coordenadas de las ventanas de texto; None para ángulos que no son de LTspice.
+        slf.rotate = {
+            "R0": lambda x, y: (x, y),
+            "R90": lambda x, y: (-y, x),
+            "R180": lambda x, y: (-x, -y),
+            "R270": lambda x, y: (y, -x),
+        }.get(orientation)
+        # Matriz (a, b, c, d) de la skin: rotación de svg y, si está espejada, x -> -x.
+        cos, sin = {0: (1, 0), 90: (0, 1), 180: (-1, 0), 270: (0, -1)}.get(
+            slf.angle, (math.cos(math.radians(slf.angle)), math.sin(math.radians(slf.angle))))
+        slf.matrix = (flip * cos, -flip * sin, sin, cos)
+
+        # Corrimiento de la ventana de texto (antes de rotarla) según su alineación.
+        slf.alignment_offsets = {
+            "R0": {"Left": (0, 6.5)},
+            "R90": {"Left": (7, 0), "VTop": (22, 0), "VBottom": (-6, 0)},
+            "R270": {"VTop": (6, 0), "VBottom": (-18, 0)},
+        }.get(orientation, {})
+        # Anclaje de los textos horizontales: quedan del lado de afuera del componente.
+        if (orientation in ("R90", "R180") and flip == 1) or (orientation in ("R0", "R270") and flip == -1):
+            slf.text_anchor = "end"
+        else:
+            slf.text_anchor = "start"
+
+        # Transformaciones svg de la skin: de la <image> (se completa con -2x, x, y o x, y) y de la
+        # referencia <use> del modo --inline-skins (va después de "translate(x,y)").
+        if flip == -1:
+            slf.image_transform = "scale(-1, 1) translate({}, 0) rotate(%d, {}, {})" % slf.angle
+        else:
+            slf.image_transform = "rotate(%d, {}, {})" % slf.angle
+        slf.use_transform = (" scale(-1,1)" if flip == -1 else "") + (f" rotate({slf.angle})" if slf.angle else "")
+
+    def transform_points(slf, points, x=0, y=0):
+        # Aplica la matriz a una lista de puntos (x, y) relativos al componente ubicado en (x, y).
+        a, b, c, d = slf.matrix
+        return [(x + a * px + b * py, y + c * px + d * py) for px, py in points]
+
+
+# Las 8 orientaciones de LTspice, por (orientación, flip) tal como quedan en el parser.
+orientation_transforms = {(f"R{angle}", flip): OrientationTransform(f"R{angle}", flip)
+                          for flip in (1, -1) for angle in (0, 90, 180, 270)}
+
+
+def orientation_transform(orientation, flip):
+    # Transformación de (orientación, flip). Las que no son de LTspice se arman la primera vez que aparecen.
+    transform = orientation_transforms.get((orientation, flip))
+    if transform is None:
+        transform = orientation_transforms[orientation, flip] = OrientationTransform(orientation, flip)
+    return transform
+
+
 class Component:
     def __init__(slf, component_type, position, orientation, flip, attributes, windows):
         # Constructor que inicializa el objeto "Component" con varios parámetros:
@@ -67,50 +215,36 @@ class Component:
         # Este método debe ser implementado por cada subclase, ya que cada componente lo genera de manera distinta, de otra manera lanza una excepción "NotImplementedError".
         raise NotImplementedError
 
-    def adjust_coordinates_for_orientation_and_alignment(slf, x, y, alignment):
+    def transform(slf):
+        # Transformación de la orientación actual (Flag cambia la orientación y algunos símbolos el flip
+        # de los textos después de crear el componente).
+        return orientation_transform(slf.orientation, slf.flip)
+
+    def adjust_coordinates_for_orientation_and_alignment(slf, x, y, alignment, transform=None):
         # Ajusta las coordenadas (x, y) basadas en la orientación del componente y la alineación especificada.
         # Devuelve las coordenadas ajustadas.
-
-        if alignment == "Left":
-            if slf.orientation == "R0":
-                y += 6.5
-                return x, y
-            elif slf.orientation == "R90":
-                x += 7
-                return -y, x
-        elif alignment == "VTop":
-            if slf.orientation == "R90":
-                x += 22
-            elif slf.orientation == "R270":
-                x += 6
-        elif alignment == "VBottom":
-            if slf.orientation == "R90":
-                x -= 6
-            elif slf.orientation == "R270":
-                x -= 18
-
-        return slf.rotate_coordinates(x, y)
-
-    def rotate_coordinates(slf, x, y):
+        transform = transform or slf.transform()
+        offset = transform.alignment_offsets.get(alignment)
+        if offset is not None:
+            x += offset[0]
+            y += offset[1]
+        return slf.rotate_coordinates(x, y, transform)
+
+    def rotate_coordinates(slf, x, y, transform=None):
         # Rota las coordenadas (x, y) en función de la orientación del componente.
         # Devuelve las coordenadas rotadas.
-
-        if slf.orientation == "R0":
-            return x, y
-        elif slf.orientation == "R90":
-            return -y, x
-        elif slf.orientation == "R180":
-            return -x, -y
-        elif slf.orientation == "R270":
-            return y, -x
+        rotate = (transform or slf.transform()).rotate
+        if rotate is not None:
+            return rotate(x, y)
 
     def add_text(slf, dwg, x, y, window, text, size=fontSize, angle=0, color = "#000000"):
         # Añade texto al dibujo "dwg" en la posición (x, y), con la alineación especificada por "window".
         # El texto se ajusta según la orientación, el espejado y el tamaño especificado.
 
         if (not (x == 25040.2 and y == -25040.2)) and text != '""':
+            transform = slf.transform()
             coords = slf.adjust_coordinates_for_orientation_and_alignment(
-                window[0], window[1], window[2])
+                window[0], window[1], window[2], transform)
             if coords is None:
                 raise ValueError(
                     "Coords cannot be None. Please check the window value.")
@@ -123,8 +257,8 @@ class Component:
                     x + (slf.flip) * coords[0], y + coords[1]), font_family=font, font_size=size, text_anchor="middle", fill=color))
             else:
                 # Crea un elemento de texto, ajustando la alineación según la orientación y el espejado:
-                text_element = dwg.text(text, insert=(x + ((slf.flip) * coords[0]), y + coords[1]), font_family=font, font_size=size, text_anchor="end" if (
-                    ((slf.orientation == "R90" or slf.orientation == "R180") and slf.flip == 1) or ((slf.orientation == "R0" or slf.orientation == "R270") and slf.flip == -1)) else "start")
+                text_element = dwg.text(text, insert=(x + ((slf.flip) * coords[0]), y + coords[1]), font_family=font, font_size=size,
+                                        text_anchor=transform.text_anchor)
                 # Aplica una rotación al texto en función del ángulo especificado:
                 text_element.rotate(-angle, center=(x +
                                     coords[0], y + coords[1]))
@@ -132,231 +266,10 @@ class Component:
 
     def draw_image_with_rotation(slf, dwg, href):
         # Dibuja una imagen en el dibujo "dwg", aplicando rotación y/o espejado según sea necesario.
+        # Cada backend ubica la skin a su manera (ver place_skin de SvgDrawing, SvgWriter y CanvasDrawing).
         x, y = slf.position
-        image = svgwrite.image.Image(href=href, insert=(x, y))
-
-        if slf.flip == -1:
-            # Si el componente está espejado, se aplica un escalado y una rotación:
-            angle = int(slf.orientation[1:])
-            transform = f"scale(-1, 1) translate({-2 * x}, 0) rotate({angle}, {x}, {y})"
-        else:
-            # Si no está espejado, solo se aplica la rotación normal:
-            angle = int(slf.orientation[1:])
-            transform = f"rotate({angle}, {x}, {y})"
-
-        image['transform'] = transform
-        image['style'] = "filter: invert(26%) sepia(97%) saturate(496%) hue-rotate(77deg) brightness(95%) contrast(85%);"
-        dwg.add(image)
-
-
-class Amp_Current(Component):
-    # Implementación de "draw". Es distinto para cada componente.
-    def draw(slf, dwg):
-        # Dibuja el componente a partir de un svg que se encuentra en la carpeta de "Skins".
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/Amp_Current.svg')
-
-        # Añade el primer texto a partir de los parámetros:
-        # "dwg" : Lienzo donde dibujar el componente.
-        # "x" : Posición en el eje x del componente.
-        # "y" : Posición en el eje y del componente.
-        # "window" : Ventana donde se detallan las propiedades del label (x,y con respecto al componente, Valor, Orientación).
-        # "text": Texto a imprimir.
-        # "size" (optional): Tamaño a imprimir el texto. Por defecto es 20px.
-        # "angle" (optional): Angulo con el cual se imprime el texto.
-
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            0, (36, 40, "Left")), slf.attributes.get("InstName", ""), angle=(int(slf.orientation[1:])) % 180)
-
-        # Añade el segundo texto a partir de los parámetros
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            3, (36, 76, "Left")), slf.attributes.get("Value", " "), angle=(int(slf.orientation[1:])) % 180)
-
-
-class Amp_Transimpedance(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(
-            dwg, 'Skins/Default/Amp_Transimpedance.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            0, (36, 40, "Left")), slf.attributes.get("InstName", ""), angle=(int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            3, (36, 76, "Left")), slf.attributes.get("Value", " "), angle=(int(slf.orientation[1:])) % 180)
-
-class Ampmeter(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/ampmeter.svg')
-        # Se agrega un offset distinto a cada orientación.
-        offset = offset_text(slf, 7, 0, -2, 0, slf.flip)
-
-        slf.add_text(dwg, slf.position[0] + offset, slf.position[1] + offset, slf.windows.get(
-            0, (-23, 14, "Left")), slf.attributes.get("InstName", ""), angle=90)
-
-
-class Arrow(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/arrow.svg')
-        # Se agrega un offset distinto a cada orientación. En este caso en el eje "x". En el eje x se aclara si está espejado.
-        offsetx = offset_text(slf, 0, 0, 0, -1, slf.flip)
-        # Se agrega un offset distinto a cada orientación. En este caso en el eje "y".
-        offsety = offset_text(slf, 14, 10, 0, 2)
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety, slf.windows.get(
-            3, (21, -18, "VTop")), slf.attributes.get("Value", "Ir"))
-
-
-class Arrow_curve(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/arrow_curve.svg')
-        offsetx = offset_text(slf, 3, 7, -3, -9, slf.flip)
-        offsety = offset_text(slf, -1, 15, -7, -4)
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(3, (63, 55, "Left")), slf.attributes.get("Value", "Vr"))
-
-
-class Arrow_Z(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/arrow_Z.svg')
-        offsetx = offset_text(slf, -3, 7, 4, -6, slf.flip)
-        offsety = offset_text(slf, 10, 10, 3, 2)
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(3, (21, -22, "Left")), slf.attributes.get("Value", "Zi"))
-
-class Arrow_Z2(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/arrow_Z2.svg')
-        offsetx = offset_text(slf, -3, 7, 4, -6, slf.flip)
-        offsety = offset_text(slf, 10, 10, 3, 2)
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(3, (21, -22, "Left")), slf.attributes.get("Value", "Zi"))
-
-class Bi(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/bi.svg')
-        offsety = offset_text(slf, -15, 0, 18)
-        offsety2 = offset_text(slf, -15, 0, -15)
-
-        slf.add_text(dwg, slf.position[0], slf.position[1] + offsety, slf.windows.get(
-            0, (36, 40, "Left")), slf.attributes.get("InstName", ""), angle=(int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1] + offsety2, slf.windows.get(
-            3, (36, 76, "Left")), slf.attributes.get("Value", " "), angle=(int(slf.orientation[1:])) % 180)
-
-
-class Bv(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/bv.svg')
-        offsety = offset_text(slf, 0, 0, 18)
-        slf.add_text(dwg, slf.position[0], slf.position[1] + offsety, slf.windows.get(
-            0, (36, 40, "Left")), slf.attributes.get("InstName", ""), angle=(int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1] - offsety + 3, slf.windows.get(
-            3, (36, 76, "Left")), slf.attributes.get("Value", " "), angle=(int(slf.orientation[1:])) % 180)
-
-
-class Bypass(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/bypass.svg')
-
-
-class Capacitor(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/cap.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1] - 8, slf.windows.get(
-            0, (24, 8, "Left")), slf.attributes.get("InstName", ""))
-        # Si el valor es numérico se agrega la unidad#
-        val = slf.attributes.get("Value", "C")
-        # No verifica el último caracter porque puede ser pico micro mili, etc
-        if all(char.isnumeric() or char == "." for char in val[:-1]):
-            units = ["f", "p", "n", "µ", "u", "m",
-                     "k", "F", "P", "N", "U", "M", "K"]
-            # El último caracter es un número o alguna unidad
-            if True in [val[-1] == units[i] for i in range(len(units))] or val[-1].isnumeric():
-                val = val + "F"
-        # Caso especial índice "MEG"
-        if val[-3:].lower() == "meg":
-            val = val + "F"
-
-        slf.add_text(dwg, slf.position[0], slf.position[1] + 5, slf.windows.get(
-            3, (24, 56, "Left")), val)
-
-
-class Cell(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/cell.svg')
-        offsetx = offset_text(slf, -5, 0, -2, slf.flip)
-        offsety = offset_text(slf, 0, 0, 9)
-
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + 6 + offsety,
-                     slf.windows.get(0, (24, 8, "Left")), slf.attributes.get("InstName", ""))
-        # Si el valor es numérico se agrega la unidad#
-        val = slf.attributes.get("Value", " ")
-        if all(char.isnumeric() or char == "." for char in val[:-1]):
-            val = val + "V"
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] - 8 + offsety,
-                     slf.windows.get(3, (24, 56, "Left")), val)
-
-
-class Current(Component):
-    def draw(slf, dwg):
-
-        offset = offset_text(slf, 22, 0, -13, 0)
-        offset3 = offset_text(slf, 22, 0, 13, 0)
-
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/current.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1] - offset, slf.windows.get(
-            0, (36, 40, "Left")), slf.attributes.get("InstName", ""))
-        # Si el valor es numérico se agrega la unidad#
-        val = slf.attributes.get("Value", " ")
-        # No verifica el último caracter porque puede ser pico micro mili, etc
-        if all(char.isnumeric() or char == "." for char in val[:-1]):
-            units = ["f", "p", "n", "µ", "u", "m",
-                     "k", "F", "P", "N", "U", "M", "K"]
-            # El último caracter es un número o alguna unidad
-            if True in [val[-1] == units[i] for i in range(len(units))] or val[-1].isnumeric():
-                val = val + "A"
-        # Caso especial índice "MEG"
-        if val[-3:].lower() == "meg":
-            val = val + "A"
-        slf.add_text(dwg, slf.position[0], slf.position[1] - offset3, slf.windows.get(
-            3, (36, 76, "Left")), slf.attributes.get("Value", " "))
-
-
-class Diode(Component):
-    def draw(slf, dwg):
-        offsety = offset_text(slf, 0, 0, 0, 3)
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/diode.svg')
-        slf.add_text(dwg, slf.position[0] + 1, slf.position[1] + 1, slf.windows.get(
-            0, (24, 0, "Left")), slf.attributes.get("InstName", ""))
-        slf.add_text(dwg, slf.position[0] + 3, slf.position[1] - 4 + offsety,
-                     slf.windows.get(3, (24, 64, "Left")), slf.attributes.get("Value", " "))
-
-class Dif(Component):
-    def draw(slf, dwg):
-        offsety = offset_text(slf, 0, 0, 0, 3)
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/dif.svg')
-
-class Diode45(Component):
-    def draw(slf, dwg):
-        offsetx = offset_text(slf, -30, 18, -5, 35, slf.flip)
-        offsety = offset_text(slf, -8, -30, -40, -15)
-
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/diode_45.svg')
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(0, (24, 0, "Left")), slf.attributes.get("InstName", ""))
-
-
-class E(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/e.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            0, (36, 40, "Left")), slf.attributes.get("InstName", ""), angle=(int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            3, (36, 76, "Left")), slf.attributes.get("Value", " "), angle=(int(slf.orientation[1:])) % 180)
-
-
-class E2(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/e2.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            0, (36, 40, "Left")), slf.attributes.get("InstName", ""), angle=(int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            3, (36, 76, "Left")), slf.attributes.get("Value", " "), angle=(int(slf.orientation[1:])) % 180)
+        used_skins.add(os.path.normpath(os.path.join(root_dir, href)))
+        dwg.place_skin(href, x, y, slf.transform())
 
 
 class Flag(Component):
@@ -364,7 +277,7 @@ class Flag(Component):
         if (slf.attributes.get("Value", slf.component_type) == "0"):
 
             # Obtiene la direccion en la se debe dibujar el componente.
-            direction = get_cable_directions(slf.position, wires)
+            direction = get_cable_directions(slf.position, wire_index)
             if direction == "up":
                 slf.orientation = "R0"
             elif direction == "down":
@@ -378,588 +291,824 @@ class Flag(Component):
         else:
             slf.draw_image_with_rotation(dwg, 'Skins/Default/flag.svg')
             place_text_according_to_cable(slf.position, slf.attributes.get(     # Obtiene la direccion en la se debe dibujar el texto (Vi--- ; ---Vo ) y luego imprime.
-                "Value", slf.component_type), wires, dwg)
-
-
-class G(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/g.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            0, (36, 40, "Left")), slf.attributes.get("InstName", ""), angle=(int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            3, (36, 76, "Left")), slf.attributes.get("Value", " "), angle=(int(slf.orientation[1:])) % 180)
-
-
-class G2(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/g2.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            0, (36, 40, "Left")), slf.attributes.get("InstName", ""), angle=(int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            3, (36, 76, "Left")), slf.attributes.get("Value", " "), angle=(int(slf.orientation[1:])) % 180)
-
-
-class GainBlock(Component):
-    def draw(slf, dwg):      
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/Gain_Block.svg')
+                "Value", slf.component_type), wire_index, dwg)
 
-        offsetx = offset_text(slf, -10, 32.5, 10, -30, slf.flip)
-        offsety = offset_text(slf, 0, 0, 5, 10, slf.flip)
-       
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety, slf.windows.get(
-            3, (-158, 48, "Left")), slf.attributes.get("Value", "K = 10"))
 
+class Symbol(Component):
+    # Componente dibujado a partir de su definición en la tabla de símbolos (symbols.json de la carpeta
+    # de skins). "definition" es la definición ya compilada por compile_symbol.
+    def __init__(slf, definition, component_type, position, orientation, flip, attributes, windows):
+        super().__init__(component_type, position, orientation, flip, attributes, windows)
+        slf.definition = definition
 
-class Inductor(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/ind.svg')
-        offsetx = offset_text(slf, 0, -112.5, 0, 112.5, slf.flip)
-        offsetx2 = offset_text(slf, 0, -112.5, 0, 112.5, slf.flip)
-        slf.flip *= -1 # el inductor tiene los textos al revés de R y C por default
-       
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1], slf.windows.get(
-            0, (-2, 40, "Left")), slf.attributes.get("InstName", ""))
-        # Si el valor es numérico se agrega la unidad#
-        val = slf.attributes.get("Value", "L")
-        # No verifica el último caracter porque puede ser pico micro mili, etc
-        if all(char.isnumeric() or char == "." for char in val[:-1]):
-            units = ["f", "p", "n", "µ", "u", "m",
-                     "k", "F", "P", "N", "U", "M", "K"]
-            # El último caracter es un número o alguna unidad
-            if True in [val[-1] == units[i] for i in range(len(units))] or val[-1].isnumeric():
-                val = val + "H"
-        # Caso especial índice "MEG"
-        if val[-3:].lower() == "meg":
-            val = val + "H"
-
-        slf.add_text(dwg, slf.position[0] + offsetx2, slf.position[1], slf.windows.get(
-            3, (-2, 72, "Left")), val)
-
-
-class LTap(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/L_Tap.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            3, (40, 58, "Left")), slf.attributes.get("Value", " "), angle=(int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            123, (40, 134, "Left")), slf.attributes.get("Value2", "n=3"), angle=(int(slf.orientation[1:])) % 180)
-
-
-class LM311(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/LM311.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            0, (-112, -16, "Left")), slf.attributes.get("InstName", ""), angle=(int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            3, (-112, 7, "Left")), slf.attributes.get("Value", " "), angle=(int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            69, (-89, 82, "Left")), "GND", "8px", angle=(int(slf.orientation[1:])) % 180)
-
-class LM7805(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/7805.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            0, (56, 32, "Left")), slf.attributes.get("InstName", ""))
-
-class MarcadorBloques(Component):
-    def draw(slf, dwg):
-        offsety = offset_text(slf,10, -13, 2, 10)
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/Marcador_Bloques.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1] + offsety, slf.windows.get(
-            0, (15, -32, "VTop")), slf.attributes.get("Value", "G"), color = "#005B96")
-
-
-class NJFet(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/njf.svg')
-        offsetx = offset_text(slf, -7, -6, 7, 6, slf.flip)
-        offsety = offset_text(slf, 15, 0, -11, 2)
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(0, (56, 32, "Left")), slf.attributes.get("InstName", ""))
-
-
-class NMOS(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/nmos.svg')
-        offsetx = offset_text(slf, -6, 0, 6, -0, slf.flip)
-        offsety = offset_text(slf, 15, 3, -7, 0)
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(0, (56, 32, "Left")), slf.attributes.get("InstName", ""))
-
-class NMOS4(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/nmos4.svg')
-        offsetx = offset_text(slf, -6, 0, 6, -0, slf.flip)
-        offsety = offset_text(slf, 15, 3, -7, 0)
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(0, (56, 32, "Left")), slf.attributes.get("InstName", ""))
-
-class NPN(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/NPN.svg')
-        offsety = offset_text(slf, 0, 0, -24, 0)
-        slf.add_text(dwg, slf.position[0], slf.position[1] + offsety, slf.windows.get(
-            0, (56, 32, "Left")), slf.attributes.get("InstName", ""))
-
-class node(Component):
     def draw(slf, dwg):
+        layouts = slf.definition["layouts"]
+        key = (slf.orientation, slf.flip)
+        layout = layouts.get(key)
+        if layout is None:
+            layout = layouts[key] = compile_layout(slf.definition["source"], slf.orientation, slf.flip)
+
+        # Algunas skins se dibujan corridas respecto del punto del símbolo (Vcc, node).
+        skin_dx, skin_dy = layout["skin_offset"]
         x, y = slf.position
-        offsetx = offset_text(slf, 16,-16,-16,16, slf.flip)
-        offsety = offset_text(slf, 16,16,-16,-16)
-        slf.position = (x + offsetx, y + offsety)
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/flag.svg')
-
-
-class Not(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/74HCU04 Not.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            0, (16, 16, "Left")), slf.attributes.get("InstName", ""), angle=(int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            3, (7, 87, "Left")), slf.attributes.get("Value", "74HCU04"), "11px",  (int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            69, (7, 28, "Left")), slf.attributes.get("Value", "Vdd"), "10px",  (int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            125, (7, 104, "Left")), slf.attributes.get("Value2", "GND"), "10px", (int(slf.orientation[1:])) % 180)
-
-
-class OpAmp(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/OA_Ideal.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            0, (-113, 80, "Left")), slf.attributes.get("InstName", ""), angle=(int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            3, (-176, 32, "Left")), slf.attributes.get("Value", " "), "9px",  (int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            123, (-176, 48, "Left")), slf.attributes.get("Value2", " "), "9px", (int(slf.orientation[1:])) % 180)
-
-class OA_Box(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/OA_Box.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            0, (-113, 80, "Left")), slf.attributes.get("InstName", ""), angle=(int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            3, (-176, 32, "Left")), slf.attributes.get("Value", " "), "9px",  (int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            123, (-176, 48, "Left")), slf.attributes.get("Value2", " "), "9px", (int(slf.orientation[1:])) % 180)
-
-class OA_Yiu(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/OA_Yiu.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            0, (-113, 80, "Left")), slf.attributes.get("InstName", ""), angle=(int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            3, (-176, 32, "Left")), slf.attributes.get("Value", " "), "9px",  (int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            123, (-176, 48, "Left")), slf.attributes.get("Value2", " "), "9px", (int(slf.orientation[1:])) % 180)
-
-class OA_Signal(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/OA_Signal.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            0, (70, 120, "Left")), slf.attributes.get("InstName", ""), angle=(int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            3, (180, 60, "Left")), slf.attributes.get("Value", " "), "20px",  (int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            123, (180, 90, "Left")), slf.attributes.get("Value2", " "), "20px", (int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            123, (180, 120, "Left")), slf.attributes.get("SpiceLine", " "), "20px", (int(slf.orientation[1:])) % 180)
-
-class OA_Signal2(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/OA_Signal2.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            0, (70, 120, "Left")), slf.attributes.get("InstName", ""), angle=(int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            3, (180, 60, "Left")), slf.attributes.get("Value", " "), "20px",  (int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            123, (180, 90, "Left")), slf.attributes.get("Value2", " "), "20px", (int(slf.orientation[1:])) % 180)
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            123, (180, 120, "Left")), slf.attributes.get("SpiceLine", " "), "20px", (int(slf.orientation[1:])) % 180)
-    
-class PJFet(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/pjf.svg')
-        offsetx = offset_text(slf, -7, -6, 7, 6, slf.flip)
-        offsety = offset_text(slf, 15, 0, -11, 2)
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(0, (56, 32, "Left")), slf.attributes.get("InstName", ""))
-
-
-class PMOS(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/pmos.svg')
-        offsetx = offset_text(slf, -7, -3, 7, 6, slf.flip)
-        offsety = offset_text(slf, 15, 2, -11, 2)
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(0, (56, 32, "Left")), slf.attributes.get("InstName", ""))
-
-class PMOS4(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/pmos4.svg')
-        offsetx = offset_text(slf, -7, -3, 7, 6, slf.flip)
-        offsety = offset_text(slf, 15, 2, -11, 2)
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(0, (56, 32, "Left")), slf.attributes.get("InstName", ""))
-        
-
-class PNP(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/PNP.svg')
-        offsety = offset_text(slf, 0, 0, -24, 0)
-        slf.add_text(dwg, slf.position[0], slf.position[1] + offsety, slf.windows.get(
-            0, (56, 32, "Left")), slf.attributes.get("InstName", ""))
-
-
-class Pot(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/pot.svg')
-        offsetx = offset_text(slf, 0, -33, 0, 20, slf.flip)
-        offsetx2 = offset_text(slf, 0, 40, 0, 2, slf.flip)
-        offsety = offset_text(slf, 10, -45, 0, 2)
-        offsety2 = offset_text(slf, 5, 5, 0, 51)
-
-        offsetxk = offset_text(slf, 0, 5, 0, -5)
-        offsetyk = offset_text(slf, 0, 7, 5, 0)
-
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1]+offsety, slf.windows.get(
-            0, (36, 10, "Left")), "P"+slf.attributes.get("InstName", "")[1:])
-        slf.add_text(dwg, slf.position[0] + offsetx2, slf.position[1]+offsety2, slf.windows.get(
-            3, (36, 40, "Left")), slf.attributes.get("Value", "R=10k")[2:] + "Ω")
-        slf.add_text(dwg, slf.position[0] + offsetxk, slf.position[1] +
-                     offsetyk, (33, 77, "Left"), "k")     # Se añade la letra "k"
-
-
-class Resistor(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/res.svg')
-        offsety = offset_text(slf, 0, 0, 10)
-        slf.add_text(dwg, slf.position[0], slf.position[1] + offsety, slf.windows.get(
-            0, (36, 40, "Left")), slf.attributes.get("InstName", ""))
-        # Si el valor es numérico se agrega la unidad#
-        val = slf.attributes.get("Value", "R")
-        # No verifica el último caracter porque puede ser pico micro mili, etc
-        if all(char.isnumeric() or char == "." for char in val[:-1]):
-            units = ["f", "p", "n", "µ", "u", "m",
-                     "k", "F", "P", "N", "U", "M", "K"]
-            # El último caracter es un número o alguna unidad
-            if True in [val[-1] == units[i] for i in range(len(units))] or val[-1].isnumeric():
-                val = val + "Ω"
-        # Caso especial índice "MEG"
-        if val[-3:].lower() == "meg":
-            val = val[:-3] + "MΩ"
-        slf.add_text(dwg, slf.position[0], slf.position[1] + offsety, slf.windows.get(
-            3, (36, 76, "Left")), val)
-
-class Res45(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/res_45.svg')
-        offsetx = offset_text(slf, 15, 0, -17, 0, slf.flip)
-        offsety = offset_text(slf, 0, -30, 10, -25)
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(0, (36, 40, "Left")), slf.attributes.get("InstName", ""))
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(3, (36, 76, "Left")), slf.attributes.get("Value", " "))
-
-
-class Res60(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/res_60.svg')
-        offsetx = offset_text(slf, 15, 0, -17, 0, slf.flip)
-        offsety = offset_text(slf, 0, -30, 10, -25)
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(0, (36, 40, "Left")), slf.attributes.get("InstName", ""))
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(3, (36, 76, "Left")), slf.attributes.get("Value", " "))
-
-
-class ResPipe(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/res_pipe.svg')
-        offsety = offset_text(slf, 7, 7)
-        slf.add_text(dwg, slf.position[0], slf.position[1] + offsety, slf.windows.get(
-            0, (36, 40, "Left")), slf.attributes.get("InstName", ""))
-        slf.add_text(dwg, slf.position[0], slf.position[1] + offsety, slf.windows.get(
-            3, (36, 76, "Left")), slf.attributes.get("Value", "R"))
-
-
-class Schottky(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/schottky.svg')
-        offsetx = offset_text(slf, -10, 0, -17, slf.flip)
-        offsety = offset_text(slf, 0, 0, 37)
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(0, (56, 32, "Left")), slf.attributes.get("InstName", ""))
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(3, (56, 68, "Left")), slf.attributes.get("Value", " "))
-
-
-class Signal(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/signal.svg')
-        offsetx = offset_text(slf, 0, 0, -8, 0, slf.flip)
-        offsety = offset_text(slf, 0, 0, 20, 0)
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(0, (36, 40, "Left")), slf.attributes.get("InstName", ""))
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(3, (36, 76, "Left")), slf.attributes.get("Value", " "))
-
-
-class Supply(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/supply.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            0, (36, 40, "Left")), slf.attributes.get("InstName", ""))
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            3, (36, 76, "Left")), slf.attributes.get("Value", " "))
-
-
-class Switch(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/switch.svg')
-
-
-class SwitchSch(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/switch_sch.svg')
+        slf.position = (x + skin_dx, y + skin_dy)
+        slf.draw_image_with_rotation(dwg, slf.definition["skin"])
+
+        slf.flip *= slf.definition["text_flip"]
+        for window_index, default, attribute, text, value_format, size, angle, color, dx, dy in layout["texts"]:
+            window = default if window_index is None else slf.windows.get(window_index, default)
+            if attribute is not None:
+                text = slf.attributes.get(attribute, text)
+                if value_format is not None:
+                    text = value_formats[value_format["format"]](text, value_format)
+            slf.add_text(dwg, slf.position[0] + dx, slf.position[1] + dy, window, text, size, angle, color)
+
+
+# Unidades del SI que pueden ir al final de un valor de LTspice (pico, micro, kilo, etc).
+si_prefixes = ["f", "p", "n", "µ", "u", "m", "k", "F", "P", "N", "U", "M", "K"]
+
+
+def format_si(val, spec):
+    # Si el valor es numérico se agrega la unidad.
+    # No verifica el último caracter porque puede ser pico micro mili, etc
+    if all(char.isnumeric() or char == "." for char in val[:-1]):
+        # El último caracter es un número o alguna unidad
+        if val[-1] in si_prefixes or val[-1].isnumeric():
+            val = val + spec["unit"]
+    # Caso especial índice "MEG"
+    if val[-3:].lower() == "meg":
+        if "meg_unit" in spec:
+            val = val[:-3] + spec["meg_unit"]
+        else:
+            val = val + spec["unit"]
+    return val
+
+
+def format_numeric(val, spec):
+    # Agrega la unidad solo si todo el valor es un número.
+    if all(char.isnumeric() or char == "." for char in val):
+        val = val + spec["unit"]
+    return val
+
+
+def format_numeric_body(val, spec):
+    # Agrega la unidad si todo el valor, salvo el último caracter, es un número.
+    if all(char.isnumeric() or char == "." for char in val[:-1]):
+        val = val + spec["unit"]
+    return val
+
+
+def format_after_equals(val, spec):
+    # "V=15" se escribe como "15V".
+    parts = val.split("=")
+    return f"{parts[1]}{parts[0]}"
+
+
+def format_affix(val, spec):
+    # Quita los primeros "strip" caracteres y agrega "prefix" y "suffix".
+    return spec.get("prefix", "") + val[spec.get("strip", 0):] + spec.get("suffix", "")
+
+
+# Reglas para escribir el valor de un componente, por nombre ("format" en symbols.json).
+value_formats = {
+    "si": format_si,
+    "numeric": format_numeric,
+    "numeric_body": format_numeric_body,
+    "after_equals": format_after_equals,
+    "affix": format_affix,
+}
+
+# Claves válidas de cada símbolo y de cada texto en symbols.json.
+symbol_keys = {"skin", "skin_dx", "skin_dy", "text_flip", "texts"}
+symbol_text_keys = {"window", "default", "attribute", "fallback", "text", "format", "unit", "meg_unit",
+                    "strip", "prefix", "suffix", "size", "angle", "color", "dx", "dy"}
+symbol_format_keys = {"format", "unit", "meg_unit", "strip", "prefix", "suffix"}
+
+
+def symbol_offset(offset, orientation, flip):
+    # Un desplazamiento de symbols.json es un número (igual en todas las orientaciones) o un diccionario
+    # por orientación de LTspice ("R0", ..., "M270"); las orientaciones que faltan valen 0.
+    if isinstance(offset, dict):
+        return offset.get(orientation_transform(orientation, flip).name, 0)
+    return offset
+
+
+def compile_layout(source, orientation, flip):
+    # Precalcula todo lo que depende de la orientación: desplazamientos, ángulo de cada texto, etc.
+    # Dibujar un componente queda en buscar su disposición y agregar los textos.
+    angle = orientation_transform(orientation, flip).text_angle
+    texts = []
+    for text in source.get("texts", []):
+        value_format = None
+        if "format" in text:
+            value_format = {key: text[key] for key in symbol_format_keys if key in text}
+        text_angle = text.get("angle", 0)
+        texts.append((
+            text.get("window"),
+            tuple(text["default"]),
+            text.get("attribute"),
+            text.get("text", text.get("fallback", "")),
+            value_format,
+            text.get("size", fontSize),
+            angle if text_angle == "rotation" else text_angle,
+            text.get("color", "#000000"),
+            symbol_offset(text.get("dx", 0), orientation, flip),
+            symbol_offset(text.get("dy", 0), orientation, flip),
+        ))
+    skin_offset = (symbol_offset(source.get("skin_dx", 0), orientation, flip),
+                   symbol_offset(source.get("skin_dy", 0), orientation, flip))
+    return {"skin_offset": skin_offset, "texts": texts}
+
+
+def validate_symbol(name, source):
+    # Revisa la definición de un símbolo y lanza ValueError con un mensaje que dice qué está mal.
+    def check(condition, message):
+        if not condition:
+            raise ValueError(f"Símbolo '{name}' en symbols.json: {message}")
+
+    def check_offset(offset, key):
+        if isinstance(offset, dict):
+            unknown = set(offset) - {transform.name for transform in orientation_transforms.values()}
+            check(not unknown, f"orientaciones desconocidas en '{key}': {', '.join(sorted(unknown))}")
+            offset = list(offset.values())
+        else:
+            offset = [offset]
+        check(all(isinstance(value, (int, float)) for value in offset), f"'{key}' debe ser numérico")
+
+    check(isinstance(source, dict), "la definición debe ser un objeto")
+    check(not set(source) - symbol_keys, f"claves desconocidas: {', '.join(sorted(set(source) - symbol_keys))}")
+    check(isinstance(source.get("skin"), str), "falta 'skin'")
+    check(source.get("text_flip", 1) in (1, -1), "'text_flip' debe ser 1 o -1")
+    for key in ("skin_dx", "skin_dy"):
+        check_offset(source.get(key, 0), key)
+    check(isinstance(source.get("texts", []), list), "'texts' debe ser una lista")
+    for text in source.get("texts", []):
+        check(isinstance(text, dict), "cada texto debe ser un objeto")
+        unknown = set(text) - symbol_text_keys
+        check(not unknown, f"claves desconocidas en un texto: {', '.join(sorted(unknown))}")
+        default = text.get("default")
+        check(isinstance(default, list) and len(default) == 3 and isinstance(default[2], str),
+              "'default' debe ser [x, y, alineación]")
+        check(("attribute" in text) != ("text" in text), "cada texto necesita 'attribute' o 'text' (uno solo)")
+        check(text.get("window") is None or isinstance(text["window"], int), "'window' debe ser un entero")
+        if "format" in text:
+            check(text["format"] in value_formats, f"formato desconocido: {text['format']}")
+            check(text["format"] not in ("si", "numeric", "numeric_body") or "unit" in text,
+                  f"el formato '{text['format']}' necesita 'unit'")
+        angle = text.get("angle", 0)
+        check(angle == "rotation" or isinstance(angle, (int, float)), "'angle' debe ser un número o \"rotation\"")
+        for key in ("dx", "dy"):
+            check_offset(text.get(key, 0), key)
+
+
+def compile_symbol(source, skin_prefix):
+    # Arma la definición lista para dibujar: la ruta de la skin y las disposiciones de las 8 orientaciones.
+    return {
+        "source": source,
+        "skin": skin_prefix + source["skin"],
+        "text_flip": source.get("text_flip", 1),
+        "layouts": {key: compile_layout(source, *key) for key in orientation_transforms},
+    }
 
 
-class TL082(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/TL082.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            0, (-113, 80, "Left")), slf.attributes.get("InstName", ""), angle=(int(slf.orientation[1:])) % 180)
+def load_symbol_table(folder=None):
+    # Lee, valida y compila symbols.json de la carpeta de skins una sola vez por proceso. Devuelve
+    # {tipo de símbolo de LTspice: definición}. Los símbolos que no están en la tabla no se dibujan.
+    global symbol_table
+    if symbol_table is not None and folder is None:
+        return symbol_table
+
+    folder = folder or skins_dir
+    with open(os.path.join(folder, 'symbols.json'), encoding='utf-8') as file:
+        sources = json.load(file)
+    # Las skins se referencian relativas a la carpeta del programa, igual que en el svg intermedio.
+    skin_prefix = os.path.relpath(folder, root_dir).replace(os.sep, '/') + '/'
+    table = {}
+    for name, source in sources.items():
+        validate_symbol(name, source)
+        table[name] = compile_symbol(source, skin_prefix)
+    if folder == skins_dir:
+        symbol_table = table
+    return table
+
+
+def open_asc(source):
+    # "source" es la ruta del .asc o su contenido en bytes.
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return open(source, 'rb')
+
+
+def read_asc_lines(filename):
+    # Lee el .asc línea por línea. Según la versión, LTspice guarda los archivos en UTF-16 o en ANSI
+    # (cp1252), y algunos vienen en UTF-8: se detecta la codificación sin leer el archivo entero.
+    with open_asc(filename) as file:
+        head = file.read(2)
+        file.seek(0)
+        if head in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE):
+            yield from io.TextIOWrapper(file, encoding='utf-16')
+        elif head[1:2] == b'\x00':
+            yield from io.TextIOWrapper(file, encoding='utf-16-le')
+        else:
+            # Se lee como UTF-8; las pocas líneas que no lo son (acentos en ANSI) se vuelven a decodificar como cp1252.
+            for line in io.TextIOWrapper(file, encoding='utf-8', errors='surrogateescape'):
+                if not line.isascii():
+                    try:
+                        line.encode('utf-8')
+                    except UnicodeEncodeError:
+                        line = line.encode('utf-8', 'surrogateescape').decode('cp1252', errors='replace')
+                yield line
+
+
+# Cada función recibe la línea separada en palabras y el estado del parser, y devuelve un registro
+# (tipo, datos) o None. Los registros que no tienen los datos esperados lanzan ValueError o IndexError.
+def parse_rectangle_record(parts, state):
+    # Rectángulo: "RECTANGLE Normal x1 y1 x2 y2".
+    x1, y1 = map(int, parts[2:4])
+    x2, y2 = map(int, parts[4:6])
+    return "RECTANGLE", (x1, y1, x2, y2)
+
+
+def parse_wire_record(parts, state):
+    # Almacena las coordenadas de las conexiones (wires).
+    return "WIRE", ((int(parts[1]), int(parts[2])), (int(parts[3]), int(parts[4])))
+
+
+def parse_line_record(parts, state):
+    # Si falta el último parámetro, asignar 0 (línea continua) por defecto
+    if len(parts) == 6:
+        line_type = 0
+    else:
+        line_type = int(parts[6])
 
-class Vcc(Component):
-    def draw(slf, dwg):
-        x, y = slf.position
-        offsetx = offset_text(slf, 20,-16,-20,16, slf.flip)
-        offsety = offset_text(slf, 16,20,-15,-15)
-        slf.position = (x + offsetx, y + offsety)
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/FLAG.svg')
-        value = slf.attributes.get("Value", "V=15")
-        parts = value.split("=")
-        formatted_value = f"{parts[1]}{parts[0]}"  # Reorganizar como "15V"
-
-        offsetx = offset_text(slf, 0,16,-3,-20, slf.flip)
-        offsety = offset_text(slf, 0,10,7,-5)
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety, slf.windows.get(
-            3, (5, 0, "Left")), formatted_value)
-
-class Voltage(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/voltage.svg')
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            0, (36, 40, "Left")), slf.attributes.get("InstName", ""))
-        # Si el valor es numérico se agrega la unidad#
-        val = slf.attributes.get("Value", " ")
-        if all(char.isnumeric() or char == "." for char in val):
-            val = val + "V"
-        slf.add_text(dwg, slf.position[0], slf.position[1], slf.windows.get(
-            3, (36, 76, "Left")), val)
-
-
-class Xtal(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/xtal_.svg')
-        offsety = offset_text(slf, 0, 0, 23, 0)
-        slf.add_text(dwg, slf.position[0], slf.position[1] - 8 + offsety, slf.windows.get(
-            0, (24, 8, "Left")), slf.attributes.get("InstName", ""))
-        slf.add_text(dwg, slf.position[0], slf.position[1] + 5 + offsety, slf.windows.get(
-            3, (24, 56, "Left")), slf.attributes.get("Value", " "))
+    x1, y1, x2, y2 = map(int, parts[2:6])
+    return "LINE", {"coords": ((x1, y1), (x2, y2)), "type": line_type}
 
 
-class Zener(Component):
-    def draw(slf, dwg):
-        slf.draw_image_with_rotation(dwg, 'Skins/Default/zener.svg')
-        offsetx = offset_text(slf, -10, 0, -18, 0, slf.flip)
-        offsety = offset_text(slf, 0, 0, 37)
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(0, (56, 32, "Left")), slf.attributes.get("InstName", ""))
-        slf.add_text(dwg, slf.position[0] + offsetx, slf.position[1] + offsety,
-                     slf.windows.get(3, (56, 68, "Left")), slf.attributes.get("Value", " "))
-
-
-def offset_text(slf, off0=0, off90=0, off180=0, off270=0, flip=1):
-    if (slf.orientation == "R0"):
-        return ((flip) * off0)
-    elif (slf.orientation == "R90"):
-        return ((flip) * off90)
-    elif (slf.orientation == "R180"):
-        return ((flip) * off180)
-    elif (slf.orientation == "R270"):
-        return ((flip) * off270)
+def parse_symbol_record(parts, state):
+    component_type = parts[1]
+    if '\\' in component_type:
+        component_type_parts = component_type.split('\\')
+        # Caso especial: si el nombre del componente termina en "\\".
+        if component_type_parts[-1] == '':
+            component_name = parts[2]
+            coords_and_orientation = parts[3:]
+        else:
+            component_name = component_type_parts[-1].split()[-1]
+            coords_and_orientation = parts[2:]
     else:
-        return 0
+        component_name = component_type
+        coords_and_orientation = parts[2:]
+
+    # Extrae las coordenadas y la orientación del componente.
+    x, y = map(int, coords_and_orientation[:2])
+    orientation = coords_and_orientation[2] if len(
+        coords_and_orientation) > 2 else "R0"
+
+    # Determina si el componente está espejado.
+    if orientation.startswith("M"):
+        orientation = 'R' + orientation[1:]
+        flip = -1
+    else:
+        flip = 1
+
+    # El componente anterior ya está completo (sus SYMATTR y WINDOW vienen antes del nuevo SYMBOL).
+    previous = state["component"]
+    state["component"] = {"type": component_name, "position": (x, y),
+                          "orientation": orientation, "flip": flip,
+                          "attributes": {}, "windows": {}}
+    if previous:
+        return "COMPONENT", previous
+    return None
+
+
+def parse_symattr_record(parts, state):
+    # Almacena los atributos del componente actual
+    if state["component"]:
+        attribute_name = parts[1]
+        attribute_value = " ".join(parts[2:])
+        state["component"]["attributes"][attribute_name] = attribute_value
+    return None
+
+
+def parse_window_record(parts, state):
+    # Procesa la ventana asociada al componente.
+    if state["component"]:
+        if "Invisible" in parts:
+            x = 25040.2
+            y = -25040.2
+        else:
+            x, y = map(int, parts[2:4])
+
+        window_index = int(parts[1])
+        alignment = parts[4]
+        state["component"]["windows"][window_index] = (x, y, alignment)
+    return None
+
+
+def parse_flag_record(parts, state):
+    # Procesa los flags (banderas) como un tipo especial de componente.
+    x, y = map(int, parts[1:3])
+    flag = {"type": "flag", "position": (x, y),
+            "orientation": "R0", "flip": 1,
+            "attributes": {"Value": parts[3]}, "windows": {}}
+    return "COMPONENT", flag
+
+
+def parse_text_record(parts, state):
+    # Procesa las líneas de texto. Solo se guardan los comentarios (;), no las directivas (!).
+    x, y = map(int, parts[1:3])
+    orientation = parts[3]
+    if len(parts) > 5 and parts[5].startswith(";"):
+        comment = " ".join(parts[5:])[1:]
+        return "TEXT", {"position": (x, y), "orientation": orientation, "text": comment}
+    return None
+
+
+asc_record_parsers = {
+    "RECTANGLE": parse_rectangle_record,
+    "WIRE": parse_wire_record,
+    "LINE": parse_line_record,
+    "SYMBOL": parse_symbol_record,
+    "SYMATTR": parse_symattr_record,
+    "WINDOW": parse_window_record,
+    "FLAG": parse_flag_record,
+    "TEXT": parse_text_record,
+}
+
+
+def iter_asc_records(filename):
+    # Recorre el .asc una sola vez y va devolviendo los registros (tipo, datos) a medida que se completan.
+    # Las líneas vacías, las palabras clave desconocidas y los registros mal formados se ignoran.
+    state = {"component": None}
+    for line in read_asc_lines(filename):
+        parts = line.split()
+        if not parts:
+            continue
+        record_parser = asc_record_parsers.get(parts[0])
+        if record_parser is None:
+            continue
+        try:
+            record = record_parser(parts, state)
+        except (ValueError, IndexError):
+            continue
+        if record is not None:
+            yield record
 
+    # Añade el último componente encontrado.
+    if state["component"]:
+        yield "COMPONENT", state["component"]
 
-def parse_asc_file(filename):
+
+def parse_sheet(filename):
+    # Lee el .asc en una sola pasada y devuelve (wires, lines, components, comments, rectangles), con todos
+    # los rectángulos (x1, y1, x2, y2) en el orden del archivo.
     # Inicializa las listas para almacenar los wires (conexiones) y componentes.
     wires = []
     lines = []
     components = []
     comments = []
-    current_component = None
-    windowsize = None
-    # Tamaño inicial del rectángulo más grande encontrado.
-    max_rectangle_size = (0, 0)
+    rectangles = []
+
+    # Una sola pasada: los rectángulos se procesan junto con el resto de los registros.
+    for kind, data in iter_asc_records(filename):
+        if kind == "WIRE":
+            wires.append(data)
+        elif kind == "COMPONENT":
+            components.append(data)
+        elif kind == "LINE":
+            lines.append(data)
+        elif kind == "TEXT":
+            comments.append(data)
+        elif kind == "RECTANGLE":
+            rectangles.append(data)
+    return wires, lines, components, comments, rectangles
+
+
+def parse_asc_file(filename):
     global minx
     global miny
-    # Establece valores iniciales altos para las coordenadas mínimas (minx, miny).
-    minx = 10000
-    miny = 10000
-    found_rectangle = False
-
-    with open(filename, 'r') as file:
-        for line in file:
-            parts = line.split()
-
-            if parts[0] == 'RECTANGLE':
-                # Identifica líneas que describen rectángulos y calcula sus dimensiones.
-                found_rectangle = True
-                x1, y1 = map(int, parts[2:4])
-                x2, y2 = map(int, parts[4:6])
-                dx = abs(x1 - x2)
-                dy = abs(y1 - y2)
-                # Actualiza las coordenadas mínimas.
-                minx = min([x1, x2, minx])
-                miny = min([y1, y2, miny])
-                # Si el área del rectángulo es mayor que el máximo anterior, lo actualiza.
-                if (dx * dy) > (max_rectangle_size[0] * max_rectangle_size[1]):
-                    max_rectangle_size = (dx, dy)
-
-        # Si no se encuentra ningún rectángulo, asigna valores predeterminados.
-        if not found_rectangle:
-            dx = 10000
-            dy = 10000
-            minx = -5000
-            miny = -5000
-            if (dx * dy) > (max_rectangle_size[0] * max_rectangle_size[1]):
-                max_rectangle_size = (dx, dy)
-
-        # Reinicia el puntero del archivo al principio para procesar las demás líneas.
-        file.seek(0)
-        for line in file:
-            parts = line.split()
-
-            if parts[0] == "WIRE":
-                # Almacena las coordenadas de las conexiones (wires).
-                x1, y1, x2, y2 = map(int, parts[1:])
-                wires.append(((x1, y1), (x2, y2)))
-
-            if parts[0] == "LINE":
-                # Si falta el último parámetro, asignar 1 por defecto
-                if len(parts) == 6:
-                    line_type = 0
-                else:
-                    line_type = int(parts[5])
-
-                x1, y1, x2, y2 = map(int, parts[2:6])
-                lines.append(
-                    {"coords": ((x1, y1), (x2, y2)), "type": line_type})
-
-            elif parts[0] == "SYMBOL":
-                # Si hay un componente actual, lo agrega a la lista de componentes.
-                if current_component:
-                    components.append(current_component)
-
-                component_type = parts[1]
-                if '\\' in component_type:
-                    component_type_parts = component_type.split('\\')
-                    # Caso especial: si el nombre del componente termina en "\\".
-                    if component_type_parts[-1] == '':
-                        component_name = parts[2]
-                        coords_and_orientation = parts[3:]
-                    else:
-                        component_name = component_type_parts[-1].split()[-1]
-                        coords_and_orientation = parts[2:]
-                else:
-                    component_name = component_type
-                    coords_and_orientation = parts[2:]
-
-                # Extrae las coordenadas y la orientación del componente.
-                x, y = map(int, coords_and_orientation[:2])
-                orientation = coords_and_orientation[2] if len(
-                    coords_and_orientation) > 2 else "R0"
-
-                # Determina si el componente está espejado.
-                if orientation.startswith("M"):
-                    orientation = 'R' + orientation[1:]
-                    flip = -1
-                else:
-                    flip = 1
-
-                # Crea un diccionario para el componente actual con sus propiedades.
-                current_component = {"type": component_name, "position": (x, y),
-                                     "orientation": orientation, "flip": flip,
-                                     "attributes": {}, "windows": {}}
-
-            elif parts[0] == "SYMATTR" and current_component:
-                # Almacena los atributos del componente actual
-                attribute_name = parts[1]
-                attribute_value = " ".join(parts[2:])
-                current_component["attributes"][attribute_name] = attribute_value
-
-            elif parts[0] == "WINDOW" and current_component:
-                # Procesa la ventana asociada al componente.
-                if "Invisible" in parts:
-                    x = 25040.2
-                    y = -25040.2
-                else:
-                    x, y = map(int, parts[2:4])
-
-                window_index = int(parts[1])
-                alignment = parts[4]
-                current_component["windows"][window_index] = (x, y, alignment)
-
-            elif parts[0] == "FLAG":
-                # Procesa los flags (banderas) como un tipo especial de componente.
-                x, y = map(int, parts[1:3])
-                component_type = "flag"
-                orientation = "R0"
-                flip = 1
-                flag = {"type": component_type, "position": (x, y),
-                        "orientation": orientation, "flip": flip,
-                        "attributes": {}, "windows": {}}
-                flag["attributes"]["Value"] = parts[3]
-                components.append(flag)
-            
-            elif parts[0] == "TEXT":
-                # Procesa las líneas de texto. Identifica comentarios (;) y directivas (!).
-                x, y = map(int, parts[1:3])
-                orientation = parts[3]
-                if parts[5].startswith(";"):
-                    comment = " ".join(parts[5:])[1:]
-                    comments.append({"position": (x, y), "orientation": orientation, "text": comment})
-
-        # Añade el último componente encontrado a la lista.
-        if current_component:
-            components.append(current_component)
+    wires, lines, components, comments, rectangles = parse_sheet(filename)
+
+    # El marco de la figura sale de los rectángulos. Si no hay ninguno, "windowsize" queda en None y el marco
+    # se ajusta después a lo que ocupa el dibujo (ver fit_frame).
+    minx = miny = None
+    max_rectangle_size = (0, 0)
+    if rectangles:
+        minx, miny, max_rectangle_size = rectangles_frame(rectangles)
 
     # Actualiza el tamaño de la ventana si se encontraron rectángulos.
+    windowsize = None
     if max_rectangle_size != (0, 0):
         windowsize = max_rectangle_size
 
     return wires, lines, components, comments, windowsize
 
 
-def get_cable_directions(pin_position, cables):
-    # Recibe la posición de un pin y una lista de cables (definidos por posiciones de inicio y fin).
-    # Devuelve una lista de direcciones (right, left, up, down) en las que hay cables conectados al pin.
-
-    directions = []
-    for (start, end) in cables:
-        if pin_position == start:
-            # Si la posición del pin coincide con el inicio del cable, calcula la dirección hacia el final del cable.
-            dx = end[0] - start[0]
-            dy = end[1] - start[1]
-        elif pin_position == end:
-            # Si la posición del pin coincide con el final del cable, calcula la dirección hacia el inicio del cable.
-            dx = start[0] - end[0]
-            dy = start[1] - end[1]
+def rectangles_frame(rectangles):
+    # Marco de la figura a partir de los rectángulos (x1, y1, x2, y2): las coordenadas mínimas de todos
+    # (nunca mayores que 10000) y el tamaño del rectángulo de mayor área (el primero, si hay empates).
+    minx = miny = 10000
+    size = (0, 0)
+    for x1, y1, x2, y2 in rectangles:
+        dx = abs(x1 - x2)
+        dy = abs(y1 - y2)
+        minx = min(x1, x2, minx)
+        miny = min(y1, y2, miny)
+        # Si el área del rectángulo es mayor que el máximo anterior, lo actualiza.
+        if dx * dy > size[0] * size[1]:
+            size = (dx, dy)
+    return minx, miny, size
+
+
+class SheetGeometry:
+    # Geometría de un esquemático en listas planas: cables y líneas como (x1, y1, x2, y2), componentes y
+    # comentarios como su punto de anclaje (x, y) y la matriz de la orientación de cada componente. Calcula
+    # de una vez la caja que contiene la hoja y la ubicación de los componentes según su orientación; qué
+    # elementos tocan una región lo resuelve SpatialIndex.
+    def __init__(slf, wires=(), lines=(), components=(), comments=()):
+        slf.wires = [(x1, y1, x2, y2) for (x1, y1), (x2, y2) in wires]
+        slf.lines = [(x1, y1, x2, y2) for (x1, y1), (x2, y2) in (line["coords"] for line in lines)]
+        slf.anchors = [component["position"] for component in components]
+        slf.matrices = [orientation_transform(component["orientation"], component["flip"]).matrix
+                        for component in components]
+        slf.comments = [comment["position"] for comment in comments]
+
+    def bounds(slf):
+        # Caja (x0, y0, x1, y1) que contiene todos los puntos de la hoja (extremos de cables y líneas,
+        # anclajes de componentes y comentarios), o None si la hoja está vacía.
+        boxes = []
+        for segments in (slf.wires, slf.lines):
+            if segments:
+                x1s, y1s, x2s, y2s = zip(*segments)
+                boxes.append((min(min(x1s), min(x2s)), min(min(y1s), min(y2s)),
+                              max(max(x1s), max(x2s)), max(max(y1s), max(y2s))))
+        for points in (slf.anchors, slf.comments):
+            if points:
+                xs, ys = zip(*points)
+                boxes.append((min(xs), min(ys), max(xs), max(ys)))
+        if not boxes:
+            return None
+        x0s, y0s, x1s, y1s = zip(*boxes)
+        return min(x0s), min(y0s), max(x1s), max(y1s)
+
+    def place(slf, offsets):
+        # Ubica en la hoja un punto de cada componente dado relativo al componente sin rotar (por ejemplo,
+        # una esquina de su skin): aplica la matriz de la orientación de cada uno y suma su anclaje.
+        # "offsets" es una lista de (u, v), uno por componente. Devuelve la lista de (x, y).
+        return [(x + a * u + b * v, y + c * u + d * v)
+                for (x, y), (a, b, c, d), (u, v) in zip(slf.anchors, slf.matrices, offsets)]
+
+    def component_boxes(slf, skin_boxes, margin=0):
+        # Caja en la hoja de cada componente: la caja de su skin (x0, y0, x1, y1 relativa al componente sin
+        # rotar, una por componente) ubicada según su orientación y agrandada "margin" de cada lado. Como la
+        # transformación es lineal, cada coordenada de la caja ubicada es la suma de los extremos de cada
+        # término, sin ubicar las cuatro esquinas.
+        boxes = []
+        for (x, y), (a, b, c, d), (u0, v0, u1, v1) in zip(slf.anchors, slf.matrices, skin_boxes):
+            au0, au1, bv0, bv1 = a * u0, a * u1, b * v0, b * v1
+            cu0, cu1, dv0, dv1 = c * u0, c * u1, d * v0, d * v1
+            boxes.append((x + min(au0, au1) + min(bv0, bv1) - margin, y + min(cu0, cu1) + min(dv0, dv1) - margin,
+                          x + max(au0, au1) + max(bv0, bv1) + margin, y + max(cu0, cu1) + max(dv0, dv1) + margin))
+        return boxes
+
+    def contained_in(slf, region):
+        # True si todos los cables, líneas y anclajes de la hoja están dentro de la región.
+        box = slf.bounds()
+        return box is None or (box[0] >= region[0] and box[1] >= region[1] and box[2] <= region[2] and box[3] <= region[3])
+
+
+# Lado de las celdas del índice espacial, en unidades del esquemático.
+spatial_cell_size = 512
+# Margen alrededor de la skin de un componente que se reserva para sus textos al decidir si entra en el marco.
+component_text_margin = 200
+# Distancia fuera del marco a la que se cortan los cables y las líneas (más que medio ancho de trazo).
+clip_margin = 2
+
+
+class SpatialIndex:
+    # Índice espacial en grilla: cada elemento se anota en las celdas que toca su caja, así una consulta por
+    # región solo revisa los elementos de las celdas que toca la región y no toda la hoja.
+    def __init__(slf, cell=spatial_cell_size):
+        slf.cell = cell
+        # (columna, fila) -> lista de (tipo, índice).
+        slf.cells = {}
+        # (tipo, índice) -> caja (x0, y0, x1, y1).
+        slf.boxes = {}
+
+    def insert(slf, kind, index, box):
+        slf.boxes[kind, index] = box
+        cell = slf.cell
+        for column in range(int(box[0] // cell), int(box[2] // cell) + 1):
+            for row in range(int(box[1] // cell), int(box[3] // cell) + 1):
+                slf.cells.setdefault((column, row), []).append((kind, index))
+
+    def query(slf, region):
+        # Elementos cuya caja toca la región (x0, y0, x1, y1): {tipo: índices en orden}.
+        x0, y0, x1, y1 = region
+        cell = slf.cell
+        found = set()
+        for column in range(int(x0 // cell), int(x1 // cell) + 1):
+            for row in range(int(y0 // cell), int(y1 // cell) + 1):
+                for key in slf.cells.get((column, row), ()):
+                    if key in found:
+                        continue
+                    bx0, by0, bx1, by1 = slf.boxes[key]
+                    if bx0 <= x1 and bx1 >= x0 and by0 <= y1 and by1 >= y0:
+                        found.add(key)
+        result = {}
+        for kind, index in sorted(found):
+            result.setdefault(kind, []).append(index)
+        return result
+
+
+def component_skin(component, symbols):
+    # Skin con la que se dibuja el componente (ruta relativa a la carpeta del programa), o None.
+    if component["type"] == "flag":
+        return 'Skins/Default/flag.svg'
+    definition = symbols.get(component["type"])
+    return definition["skin"] if definition else None
+
+
+def build_sheet_index(wires, lines, components, comments, geometry=None):
+    # Índice espacial de todo lo que se dibuja en la hoja: cables, líneas, componentes (su skin ubicada
+    # según la orientación más un margen para los textos) y comentarios (su anclaje más el largo del texto).
+    geometry = geometry or SheetGeometry(wires, lines, components, comments)
+    index = SpatialIndex()
+    for kind, segments in (("wires", wires), ("lines", [line["coords"] for line in lines])):
+        for i, ((x1, y1), (x2, y2)) in enumerate(segments):
+            index.insert(kind, i, (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)))
+
+    symbols = load_symbol_table()
+    skin_boxes = [skin_bounds(component_skin(component, symbols)) for component in components]
+    for i, box in enumerate(geometry.component_boxes(skin_boxes, component_text_margin)):
+        index.insert("components", i, box)
+
+    size = int(fontSize[:-2])
+    for i, comment in enumerate(comments):
+        # Cota del texto: cada letra ocupa como mucho el tamaño de la fuente, hacia cualquier lado.
+        x, y = comment["position"]
+        reach = size * (len(comment["text"]) + 1)
+        index.insert("comments", i, (x - reach, y - reach, x + reach, y + reach))
+    return index
+
+
+def clip_segment(start, end, frame):
+    # Recorta el segmento al marco (x0, y0, x1, y1) con el algoritmo de Liang-Barsky. Devuelve (t0, t1),
+    # la parte del segmento (de 0 a 1) que queda dentro, o None si queda todo afuera.
+    (ax, ay), (bx, by) = start, end
+    dx = bx - ax
+    dy = by - ay
+    t0, t1 = 0, 1
+    for p, q in ((-dx, ax - frame[0]), (dx, frame[2] - ax), (-dy, ay - frame[1]), (dy, frame[3] - ay)):
+        if p == 0:
+            if q < 0:
+                return None
+            continue
+        t = q / p
+        if p < 0:
+            if t > t1:
+                return None
+            t0 = max(t0, t)
         else:
+            if t < t0:
+                return None
+            t1 = min(t1, t)
+    return t0, t1
+
+
+def segment_point(start, end, t):
+    # Punto del segmento en la posición t (0 = inicio, 1 = fin), redondeado a centésimas.
+    if t == 0:
+        return start
+    if t == 1:
+        return end
+    point = []
+    for a, b in zip(start, end):
+        value = round(a + t * (b - a), 2)
+        point.append(int(value) if value == int(value) else value)
+    return tuple(point)
+
+
+def clip_polyline(points, frame):
+    # Recorta la polilínea al marco. Devuelve la lista de tramos (listas de puntos) que quedan dentro;
+    # un tramo que sale y vuelve a entrar al marco queda partido en dos.
+    pieces = []
+    piece = None
+    for start, end in zip(points, points[1:]):
+        clipped = clip_segment(start, end, frame)
+        if clipped is None:
+            piece = None
+            continue
+        t0, t1 = clipped
+        a = segment_point(start, end, t0)
+        b = segment_point(start, end, t1)
+        if a == b:
+            # Solo toca el borde del marco.
+            piece = None
             continue
+        if piece is None or t0 != 0:
+            piece = [a]
+            pieces.append(piece)
+        piece.append(b)
+        if t1 != 1:
+            piece = None
+    return pieces
+
+
+def visible_elements(wires, lines, components, comments, frame):
+    # Qué elementos hay que dibujar para el marco (x0, y0, x1, y1): {tipo: índices}. Devuelve None si todo
+    # está dentro del marco (el caso común), así no se arma el índice.
+    geometry = SheetGeometry(wires, lines, components, comments)
+    if geometry.contained_in(frame):
+        return None
+    return build_sheet_index(wires, lines, components, comments, geometry).query(frame)
+
+
+def build_wire_index(wires):
+    # Arma un índice de los extremos de los cables: punto -> lista de (dx, dy) hacia el otro extremo
+    # de cada cable que termina en ese punto, en el mismo orden en que aparecen los cables.
+    # Así las consultas de conectividad de un punto no recorren toda la lista de cables.
+    index = {}
+    for (start, end) in wires:
+        dx = end[0] - start[0]
+        dy = end[1] - start[1]
+        index.setdefault(start, []).append((dx, dy))
+        index.setdefault(end, []).append((-dx, -dy))
+    return index
+
+
+def normalize_wires(wires):
+    # Limpia los cables tal como los guarda LTspice: descarta los de largo cero y los repetidos
+    # (en cualquiera de los dos sentidos) y une los colineales que se superponen, conservando el orden original.
+    normalized = []
+    seen = set()
+    for (start, end) in wires:
+        if start == end:
+            continue
+        key = (start, end) if start <= end else (end, start)
+        if key in seen:
+            continue
+        seen.add(key)
+        normalized.append((start, end))
+    return merge_overlapping_wires(normalized)
+
+
+def merge_overlapping_wires(wires):
+    # Une los cables horizontales de una misma fila (y los verticales de una misma columna) que se superponen
+    # en un tramo o que están uno dentro del otro: son un único cable, y por separado el extremo de uno
+    # quedaría en el interior del otro y contaría como un nodo en "T". Los que solo se tocan en un extremo
+    # no se unen. El cable unido ocupa el lugar del primero del grupo, con su sentido.
+    rows = {}
+    columns = {}
+    for i, (start, end) in enumerate(wires):
+        if start[1] == end[1]:
+            rows.setdefault(start[1], []).append((min(start[0], end[0]), max(start[0], end[0]), i))
+        elif start[0] == end[0]:
+            columns.setdefault(start[0], []).append((min(start[1], end[1]), max(start[1], end[1]), i))
+
+    merged = {}
+    removed = set()
+    for horizontal, groups in ((True, rows), (False, columns)):
+        for position, intervals in groups.items():
+            if len(intervals) < 2:
+                continue
+            intervals.sort()
+            run = None
+            for low, high, i in intervals + [(None, None, None)]:
+                if run is not None and low is not None and low < run[1]:
+                    run[1] = max(run[1], high)
+                    run[2].append(i)
+                    continue
+                if run is not None and len(run[2]) > 1:
+                    first = min(run[2])
+                    removed.update(j for j in run[2] if j != first)
+                    a, b = ((run[0], position), (run[1], position)) if horizontal else ((position, run[0]), (position, run[1]))
+                    start, end = wires[first]
+                    merged[first] = (a, b) if start <= end else (b, a)
+                run = [low, high, [i]]
+
+    if not merged:
+        return wires
+    return [merged.get(i, wire) for i, wire in enumerate(wires) if i not in removed]
+
+
+def merge_wire_chains(wires, junctions):
+    # Une los cables encadenados en polilíneas. Una cadena sigue por los puntos donde se tocan exactamente
+    # dos cables (grado 2) y se corta en los nodos y en los extremos libres.
+    # Devuelve una lista de polilíneas (listas de puntos) sin los vértices intermedios colineales.
+    # Los cables tienen que venir de normalize_wires: los colineales superpuestos ya están unidos, así
+    # ninguna cadena repite un tramo ni se corta en el extremo de un cable apoyado sobre otro.
+    ends = {}
+    for i, (start, end) in enumerate(wires):
+        ends.setdefault(start, []).append(i)
+        ends.setdefault(end, []).append(i)
+
+    used = [False] * len(wires)
+    polylines = []
+    for i, (start, end) in enumerate(wires):
+        if used[i]:
+            continue
+        used[i] = True
+        points = deque((start, end))
+
+        # Extiende la cadena hacia adelante y hacia atrás.
+        for forward in (True, False):
+            while True:
+                tip = points[-1] if forward else points[0]
+                if junctions.get(tip) != 2:
+                    break
+                following = [j for j in ends[tip] if not used[j]]
+                if not following:
+                    break
+                j = following[0]
+                used[j] = True
+                a, b = wires[j]
+                other = b if a == tip else a
+                if forward:
+                    points.append(other)
+                else:
+                    points.appendleft(other)
+
+        polylines.append(remove_collinear_points(list(points)))
+    return polylines
+
+
+def remove_collinear_points(points):
+    # Quita los vértices que están en medio de un tramo recto (mismo sentido antes y después del punto).
+    simplified = [points[0]]
+    for i in range(1, len(points) - 1):
+        x0, y0 = simplified[-1]
+        x1, y1 = points[i]
+        x2, y2 = points[i + 1]
+        cross = (x1 - x0) * (y2 - y1) - (y1 - y0) * (x2 - x1)
+        dot = (x1 - x0) * (x2 - x1) + (y1 - y0) * (y2 - y1)
+        if cross != 0 or dot <= 0:
+            simplified.append(points[i])
+    simplified.append(points[-1])
+    return simplified
+
+
+def count_covering_segments(segments, positions):
+    # Barrido sobre una misma recta: "segments" son intervalos (inicio, fin) y "positions" puntos sobre esa recta.
+    # Devuelve {posición: cantidad de segmentos que la contienen estrictamente en su interior}.
+    # Los segmentos se activan al pasar por su inicio y se descartan (heap por fin) al pasar por su fin: O(n log n).
+    segments = sorted(segments)
+    active = []
+    covering = {}
+    i = 0
+    for position in sorted(set(positions)):
+        while i < len(segments) and segments[i][0] < position:
+            heapq.heappush(active, segments[i][1])
+            i += 1
+        while active and active[0] <= position:
+            heapq.heappop(active)
+        if active:
+            covering[position] = len(active)
+    return covering
+
+
+def find_junctions(wires, index):
+    # Calcula el grado de cada punto de conexión: cada extremo de cable que llega al punto suma 1 y cada
+    # cable que pasa por el punto sin terminar en él (una "T", otro cable apoyado en su interior) suma 2.
+    # Devuelve {punto: grado}; los puntos de grado 3 o más llevan un nodo dibujado.
+    degrees = {point: len(directions) for point, directions in index.items()}
+
+    # Cables horizontales agrupados por fila y verticales por columna. Los cables en diagonal solo
+    # cuentan por sus extremos.
+    rows = {}
+    columns = {}
+    for (start, end) in wires:
+        if start[1] == end[1] and start[0] != end[0]:
+            rows.setdefault(start[1], []).append((min(start[0], end[0]), max(start[0], end[0])))
+        elif start[0] == end[0] and start[1] != end[1]:
+            columns.setdefault(start[0], []).append((min(start[1], end[1]), max(start[1], end[1])))
+
+    # Solo interesa saber si un extremo cae en el interior de otro cable de su fila o de su columna.
+    row_queries = {}
+    column_queries = {}
+    for (x, y) in index:
+        if y in rows:
+            row_queries.setdefault(y, []).append(x)
+        if x in columns:
+            column_queries.setdefault(x, []).append(y)
+
+    for y, xs in row_queries.items():
+        for x, count in count_covering_segments(rows[y], xs).items():
+            degrees[(x, y)] += 2 * count
+    for x, ys in column_queries.items():
+        for y, count in count_covering_segments(columns[x], ys).items():
+            degrees[(x, y)] += 2 * count
+
+    return degrees
+
+
+def get_cable_directions(pin_position, index):
+    # Recibe la posición de un pin y el índice de extremos de cables (ver "build_wire_index").
+    # Devuelve una lista de direcciones (right, left, up, down) en las que hay cables conectados al pin.
 
+    directions = []
+    for (dx, dy) in index.get(pin_position, ()):
         # Determina las direcciones en función de los valores dx y dy y añade las direcciones correspondientes a la lista.
         if dx > 0 and "right" not in directions:
             directions.append("right")
@@ -971,17 +1120,17 @@ def get_cable_directions(pin_position, cables):
             directions.append("up")
 
     # Si se encontraron direcciones, las devuelve como una cadena separada por comas.
-    # Si no se encontraron direcciones, devuelve None.
+    # Si no se encontraron direcciones, devuelve "up".
     if directions:
         return ", ".join(directions)
     else:
         return "up"
 
 
-def place_text_according_to_cable(pin_position, text, cables, dwg, offset=20):
+def place_text_according_to_cable(pin_position, text, index, dwg, offset=20):
     # Coloca un texto en un diagrama SVG en función de la dirección de los cables conectados al pin.
 
-    directions = get_cable_directions(pin_position, cables)
+    directions = get_cable_directions(pin_position, index)
 
     if "up" in directions:
         # Si hay un cable hacia arriba, coloca el texto debajo del pin.
@@ -1050,25 +1199,216 @@ def add_comment(dwg, pos, text, angle):
     text_element.rotate(-ang, center=(pos[0], pos[1]))
     dwg.add(text_element)
 
-def create_circuit_svg(filename, wires, lines, components, comments):
-    global minx
-    global miny
-    dwg = svgwrite.Drawing(filename, size=windowsize, profile='tiny')
-    nodes = {}
+def define_skin_symbol_class():
+    # svgwrite se importa recién al usarlo (ver load_dependencies), así que la clase se define en ese momento.
+    global SkinSymbol
+
+    class SkinSymbol(svgwrite.container.Group):
+        # Grupo de <defs> que contiene la geometría de una skin. El contenido ya viene armado desde el
+        # archivo de la skin, así que se agrega directamente al xml sin pasar por la validación de svgwrite.
+        # "data-skin" guarda el archivo de origen para que el pdf pueda reusar la skin de "skin_cache".
+        def __init__(slf, symbol_id, href, skin_root):
+            super().__init__(id=symbol_id)
+            slf.href = href
+            slf.skin_root = skin_root
+
+        def get_xml(slf):
+            xml = super().get_xml()
+            xml.set('data-skin', slf.href)
+            xml.append(slf.skin_root)
+            return xml
+
+
+# Skins ya leídas y preparadas para insertarse en <defs>: ruta -> (mtime en ns, raíz xml).
+skin_trees = {}
+# Skins definidas en el documento actual (href -> id), o None si las skins se dibujan como <image>.
+skin_symbols = None
+
+svg_namespace = '{http://www.w3.org/2000/svg}'
+xlink_href = '{http://www.w3.org/1999/xlink}href'
+
+
+def load_skin_tree(href, prefix):
+    # Lee la skin y la prepara para convivir con otras dentro de un mismo documento: los ids y las clases
+    # (y las reglas css que las usan) llevan el prefijo de la skin. Devuelve None si el archivo no existe.
+    path = os.path.join(root_dir, href)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    cached = skin_trees.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    root = ET.parse(path).getroot()
+
+    def prefixed_reference(match):
+        return match.group(1) + prefix + "-" + match.group(2)
+
+    for element in root.iter():
+        if not isinstance(element.tag, str):
+            continue
+        # Se descarta la indentación del archivo original.
+        if element.text is not None and not element.text.strip():
+            element.text = None
+        if element.tail is not None and not element.tail.strip():
+            element.tail = None
+        # Sin el namespace en cada etiqueta, el svg se serializa igual que el resto del documento.
+        if element.tag.startswith(svg_namespace):
+            element.tag = element.tag[len(svg_namespace):]
+        if 'id' in element.attrib:
+            element.set('id', prefix + "-" + element.get('id'))
+        if 'class' in element.attrib:
+            element.set('class', " ".join(prefix + "-" + name for name in element.get('class').split()))
+        for attribute in ('href', xlink_href):
+            value = element.get(attribute)
+            if value and value.startswith('#'):
+                element.set(attribute, '#' + prefix + "-" + value[1:])
+        for attribute, value in element.attrib.items():
+            if 'url(#' in value:
+                element.set(attribute, re.sub(r'(url\(#)([^)]+)', prefixed_reference, value))
+        if element.tag == 'style' and element.text:
+            element.text = re.sub(r'(\.)(-?[_a-zA-Z][\w-]*)', prefixed_reference, element.text)
+
+    # Una <image> sin tamaño usa el del viewBox de la skin; dentro de <defs> se deja explícito.
+    view_box = root.get('viewBox')
+    if view_box and not (root.get('width') and root.get('height')):
+        _, _, width, height = view_box.replace(',', ' ').split()
+        root.set('width', width)
+        root.set('height', height)
+
+    skin_trees[path] = (mtime, root)
+    return root
+
+
+def place_svg_skin(dwg, href, x, y, transform):
+    # place_skin de los backends svg (SvgDrawing y SvgWriter): agrega la skin del componente ubicado en
+    # (x, y) con la orientación "transform".
+    if skin_symbols is not None:
+        # Modo <defs>/<use>: la skin se define una sola vez en el documento y cada instancia es una
+        # referencia con una transformación compacta (equivalente a la de la imagen).
+        symbol_id = define_skin_symbol(dwg, href)
+        if symbol_id is None:
+            return
+        use = dwg.use('#' + symbol_id)
+        use['transform'] = f"translate({x},{y})" + transform.use_transform
+        dwg.add(use)
+        return
+
+    image = dwg.image(href, insert=(x, y))
+    if transform.flip == -1:
+        # Si el componente está espejado, se aplica un escalado y una rotación:
+        image['transform'] = transform.image_transform.format(-2 * x, x, y)
+    else:
+        # Si no está espejado, solo se aplica la rotación normal:
+        image['transform'] = transform.image_transform.format(x, y)
+    image['style'] = "filter: invert(26%) sepia(97%) saturate(496%) hue-rotate(77deg) brightness(95%) contrast(85%);"
+    dwg.add(image)
+
+
+def define_svg_drawing_class():
+    # Igual que SkinSymbol, se define cuando se importa svgwrite.
+    global SvgDrawing
+
+    class SvgDrawing(svgwrite.Drawing):
+        # Dibujo de svgwrite del backend "svg", con el place_skin que comparten todos los backends.
+        def image(slf, href, insert):
+            # La <image> de la skin se arma fuera de la fábrica del dibujo, sin el perfil 'tiny'.
+            return svgwrite.image.Image(href=href, insert=insert)
+
+        def place_skin(slf, href, x, y, transform):
+            place_svg_skin(slf, href, x, y, transform)
+
+
+def define_skin_symbol(dwg, href):
+    # Devuelve el id del grupo de <defs> con la skin "href", definiéndolo la primera vez que se usa.
+    if href not in skin_symbols:
+        name = os.path.splitext(os.path.basename(href))[0]
+        symbol_id = "skin-" + re.sub(r'[^A-Za-z0-9_-]', '_', name)
+        skin_root = load_skin_tree(href, symbol_id)
+        if skin_root is None:
+            skin_symbols[href] = None
+        else:
+            dwg.defs.add(SkinSymbol(symbol_id, href, skin_root))
+            skin_symbols[href] = symbol_id
+    return skin_symbols[href]
+
+
+def create_circuit_svg(wires, lines, components, comments, inline_skins=None, min_text_size=0):
+    # Arma el dibujo svg del circuito en memoria y lo devuelve, sin escribir nada a disco.
+    # Con "inline_skins" cada skin usada se define una vez en <defs> y los componentes son <use>;
+    # si no, cada componente es una <image> que apunta al archivo de la skin.
+    # Con el backend "stream" el svg se escribe con SvgWriter en lugar de svgwrite. Los textos con tamaño
+    # de fuente menor que "min_text_size" (en unidades del svg) no se dibujan.
+    global skin_symbols
+    load_dependencies()
+    if render_options["backend"] == "stream":
+        dwg = SvgWriter(windowsize, min_text_size)
+    else:
+        dwg = SvgDrawing(size=windowsize, profile='tiny')
 
-    # Dibujar cables y detectar nodos
-    for (start, end) in wires:
-        dwg.add(dwg.line(start=start, end=end, stroke=svgwrite.rgb(
-            0, 0, 0, '%'), stroke_linecap="round", stroke_linejoin="round", stroke_miterlimit="10", stroke_width=1.5))
-        for point in [start, end]:
-            if point in nodes:
-                nodes[point] += 1
-            else:
-                nodes[point] = 1
+    if inline_skins is None:
+        inline_skins = render_options["inline_skins"]
+    skin_symbols = {} if inline_skins else None
 
-    # Dibujar nodos si se intersectan 3 o más cables
-    for point, count in nodes.items():
-        if count >= 3:
+    draw_circuit(dwg, wires, lines, components, comments, sheet_frame())
+    if min_text_size and not isinstance(dwg, SvgWriter):
+        dwg.elements = [element for element in dwg.elements
+                        if element.elementname != 'text' or text_size(element.attribs) >= min_text_size]
+
+    dwg.viewbox(minx, miny, windowsize[0], windowsize[1])
+    return dwg
+
+
+def text_size(attribs):
+    # Tamaño de fuente de un texto, en unidades del svg.
+    return svg_converter.convertLength(str(attribs.get('font-size', attribs.get('font_size', fontSize))))
+
+
+def sheet_frame():
+    # Marco de la figura actual como caja (x0, y0, x1, y1).
+    return (minx, miny, minx + windowsize[0], miny + windowsize[1])
+
+
+def draw_circuit(dwg, wires, lines, components, comments, frame=None):
+    # Dibuja cables, nodos, comentarios, líneas y componentes sobre "dwg", que puede ser un SvgDrawing,
+    # un SvgWriter o un CanvasDrawing: todos ofrecen los mismos métodos de dibujo, incluido place_skin.
+    # Con "frame" (x0, y0, x1, y1) solo se dibuja lo que toca el marco: lo que queda afuera no se agrega
+    # y los cables y líneas que lo cruzan se recortan en el borde.
+    global wire_index
+    global used_skins
+    load_dependencies()
+    used_skins = set()
+
+    # Índice de extremos de cables, usado por los flags y para detectar nodos. Se arma con todos los
+    # cables para que las conexiones no cambien en el borde del marco.
+    wire_index = build_wire_index(wires)
+    junctions = find_junctions(wires, wire_index)
+
+    visible = None if frame is None else visible_elements(wires, lines, components, comments, frame)
+    if visible is not None:
+        # Los trazos se cortan un poco afuera del marco para que su terminación redondeada no se vea en el borde.
+        clip_frame = (frame[0] - clip_margin, frame[1] - clip_margin, frame[2] + clip_margin, frame[3] + clip_margin)
+        wires = [wires[i] for i in visible.get("wires", [])]
+        lines = [lines[i] for i in visible.get("lines", [])]
+        components = [components[i] for i in visible.get("components", [])]
+        comments = [comments[i] for i in visible.get("comments", [])]
+
+    # Dibujar cables. Los cables encadenados se dibujan como una sola polilínea.
+    for chain in merge_wire_chains(wires, junctions):
+        for points in ([chain] if visible is None else clip_polyline(chain, clip_frame)):
+            if len(points) == 2:
+                dwg.add(dwg.line(start=points[0], end=points[1], stroke=svgwrite.rgb(
+                    0, 0, 0, '%'), stroke_linecap="round", stroke_linejoin="round", stroke_miterlimit="10", stroke_width=1.5))
+            else:
+                dwg.add(dwg.polyline(points, fill="none", stroke=svgwrite.rgb(
+                    0, 0, 0, '%'), stroke_linecap="round", stroke_linejoin="round", stroke_miterlimit="10", stroke_width=1.5))
+
+    # Dibujar nodos donde se conectan 3 o más cables, incluyendo las uniones en "T"
+    for point, degree in junctions.items():
+        if degree >= 3:
+            if visible is not None and not (frame[0] - 4 <= point[0] <= frame[2] + 4 and frame[1] - 4 <= point[1] <= frame[3] + 4):
+                continue
             dwg.add(dwg.circle(center=point, r=4, fill='black'))
 
     #Escribir comentarios
@@ -1092,6 +1432,18 @@ def create_circuit_svg(filename, wires, lines, components, comments):
             stroke_dasharray = "1,4"  # Línea punteada
             stroke_width = 0.5
 
+        if visible is not None:
+            # La línea se recorta al marco. Si es punteada, el comienzo se recorta en un número entero de
+            # períodos del punteado para que dentro del marco los trazos queden en el mismo lugar.
+            t0, t1 = clip_segment(start, end, clip_frame) or (0, 0)
+            if t0 == t1:
+                continue
+            if stroke_dasharray and t0:
+                period = sum(float(value) for value in stroke_dasharray.split(","))
+                length = math.dist(start, end)
+                t0 = (t0 * length // period) * period / length
+            start, end = segment_point(start, end, t0), segment_point(start, end, t1)
+
         if stroke_dasharray:
             line_element = dwg.line(start=start, end=end, stroke=svgwrite.rgb(
                 0, 0, 0, '%'), stroke_linecap="round", stroke_linejoin="round", stroke_miterlimit="10",
@@ -1104,218 +1456,2032 @@ def create_circuit_svg(filename, wires, lines, components, comments):
         dwg.add(line_element)
 
     # Dibujar componentes
-    component_objects = {
-        "7805": LM7805,
-        "Amp_Current": Amp_Current,
-        "Amp_Transimpedance": Amp_Transimpedance,
-        "ampmeter": Ampmeter,
-        "arrow": Arrow,
-        "arrow_curve": Arrow_curve,
-        "arrow_Z": Arrow_Z,
-        "arrow_Z2": Arrow_Z2,
-        "bv": Bv,
-        "bi": Bi,
-        "bypass": Bypass,
-        "cap": Capacitor,
-        "current": Current,
-        "cell": Cell,
-        "dif": Dif,
-        "diode": Diode,
-        "diode_45": Diode45,
-        "e": E,
-        "e2": E2,
-        "flag": Flag,
-        "g": G,
-        "g2": G2,
-        "Gain_Block": GainBlock,
-        "ind": Inductor,
-        "L_Tap": LTap,
-        "LM311": LM311,
-        "LM741": TL082,
-        "Marcador_Bloques" : MarcadorBloques,
-        "njf": NJFet,
-        "nmos": NMOS,
-        "nmos4": NMOS4,
-        "npn": NPN,
-        "Not": Not,
-        "node": node,
-        "OA_Ideal": OpAmp,
-        "OA_Signal": OA_Signal,
-        "OA_Signal2": OA_Signal2,
-        "OA_Box": OA_Box,
-        "OA_Yiu": OA_Yiu,
-        "pjf": PJFet,
-        "pmos": PMOS,
-        "pmos4": PMOS4,
-        "pnp": PNP,
-        "pot": Pot,
-        "res": Resistor,
-        "res_45": Res45,
-        "res_60": Res60,
-        "res_pipe": ResPipe,
-        "schottky": Schottky,
-        "signal": Signal,
-        "supply": Supply,
-        "switch": Switch,
-        "switch_sch": SwitchSch,
-        "TL082": TL082,
-        "Vcc": Vcc,
-        "voltage": Voltage,
-        "xtal": Xtal,
-        "zener": Zener
-    }
-
+    symbols = load_symbol_table()
     for component in components:
         component_type = component["type"]
-        if component_type in component_objects:
-            component_obj = component_objects[component_type](
-                component_type,
-                component["position"],
-                component["orientation"],
-                component["flip"],
-                component["attributes"],
-                component["windows"]
-            )
-            component_obj.draw(dwg)
-
-    dwg.viewbox(minx, miny, windowsize[0], windowsize[1])
-    dwg.save()
+        if component_type == "flag":
+            component_obj = Flag(component_type, component["position"], component["orientation"],
+                                 component["flip"], component["attributes"], component["windows"])
+        elif component_type in symbols:
+            component_obj = Symbol(symbols[component_type], component_type, component["position"],
+                                   component["orientation"], component["flip"], component["attributes"],
+                                   component["windows"])
+        else:
+            continue
+        component_obj.draw(dwg)
+
+
+class FontSubsetCache:
+    # Caché de los subconjuntos de la fuente que se embeben en cada pdf. reportlab arma el subconjunto
+    # (un .ttf reducido) de cero en cada documento; acá se guarda por lista de glifos y se reutiliza
+    # en todos los archivos del lote que usen los mismos caracteres.
+    def __init__(slf, make_subset):
+        slf.make_subset = make_subset
+        slf.subsets = {}
+        slf.hits = 0
+        slf.misses = 0
+
+    def __call__(slf, subset):
+        key = tuple(subset)
+        data = slf.subsets.get(key)
+        if data is None:
+            data = slf.subsets[key] = slf.make_subset(subset)
+            slf.misses += 1
+        else:
+            slf.hits += 1
+        return data
 
+    def stats(slf):
+        return {"hits": slf.hits, "misses": slf.misses, "entries": len(slf.subsets)}
 
-def modify_svg_font(svg_filename, output_svg_filename, font_name):
-    with open(svg_filename, 'r', encoding='utf-8') as file:
-        svg_content = file.read()
 
-    # Reemplaza cualquier referencia de fuente por LM Roman 10
-    modified_svg_content = re.sub(
-        r'font-family="[^"]+"', f'font-family="{font_name}"', svg_content)
+def register_fonts():
+    # Registra la fuente LM Roman 10 una sola vez por proceso, tanto en reportlab como en el mapeo de svglib.
+    # Las llamadas siguientes no vuelven a leer ni a parsear el archivo .ttf.
+    global fonts_registered
+    global font_subset_cache
+    if fonts_registered:
+        return
+    load_dependencies()
 
-    with open(output_svg_filename, 'w', encoding='utf-8') as file:
-        file.write(modified_svg_content)
+    # svglib parsea el .ttf y lo registra en reportlab con el mismo nombre, así que no hace falta
+    # registrarlo también con pdfmetrics (eso volvía a parsear el archivo).
+    from svglib.fonts import register_font
+    register_font(font, font_path)
 
+    face = pdfmetrics.getFont(font).face
+    font_subset_cache = FontSubsetCache(face.makeSubset)
+    face.makeSubset = font_subset_cache
+    fonts_registered = True
 
-def svg_to_pdf(svg_filename, pdf_filename):
-    # Registrar la fuente LM Roman 10
-    pdfmetrics.registerFont(TTFont('LM_Roman_10', font_path))
 
-    # Registrar la fuente con el mapeo de svglib
-    from svglib.fonts import register_font
-    register_font('LM_Roman_10', font_path)
+def pdf_title(pdf_filename):
+    # Título que se guarda en los metadatos del pdf (None si no se escribe a un archivo).
+    if isinstance(pdf_filename, str):
+        return os.path.basename(pdf_filename)
+    return None
 
-    # Leer el dibujo SVG
-    drawing = svg2rlg(svg_filename)
 
-    # Crear el canvas PDF
+def new_canvas(pdf_filename):
+    # Crea el canvas del pdf con el tamaño del circuito actual.
+    load_dependencies()
     c = canvas.Canvas(pdf_filename, pagesize=windowsize)
-    c.setTitle(pdf_filename.split('\\')[-1])
-    # Dibujar el SVG en el PDF
-    renderPDF.draw(drawing, c, 0, 0)
+    title = pdf_title(pdf_filename)
+    if title is not None:
+        c.setTitle(title)
+    doc = getattr(c, '_doc', None)
+    if render_options["stable_font_subset"] and doc is not None:
+        # reportlab ya reserva los caracteres ASCII en el primer subconjunto, pero los demás (Ω, µ, tildes)
+        # ocupan los lugares libres en el orden en que aparecen. Reservándolos de antemano en un orden fijo
+        # el subconjunto es el mismo en todas las figuras y se genera una sola vez por proceso. El documento
+        # del canvas no es parte de la API pública de reportlab: si una versión nueva no lo tiene, el pdf
+        # se genera igual, con el subconjunto común.
+        pdfmetrics.getFont(font).splitString(font_subset_seed, doc)
+    return c
+
+
+class SkinCache:
+    # Caché de skins ya convertidas por svglib. Cada skin se parsea y se convierte una sola vez por proceso
+    # y el mismo grupo de reportlab se comparte entre todas las instancias y todos los archivos del lote.
+    def __init__(slf):
+        # "entries": ruta de la skin -> (mtime en ns, tamaño, sha256, grupo de reportlab).
+        slf.entries = {}
+        # Skins ya revalidadas durante la conversión actual.
+        slf.checked = set()
+        slf.hits = 0
+        slf.misses = 0
+
+    def new_render(slf):
+        # Se llama al empezar cada archivo: las skins se revalidan una vez por archivo y no por instancia.
+        slf.checked = set()
+
+    def lookup(slf, path):
+        # Devuelve el grupo guardado para la skin o None si no está o si el archivo cambió.
+        entry = slf.entries.get(path)
+        if entry is None:
+            return None
+
+        if path not in slf.checked:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del slf.entries[path]
+                return None
+            if (stat.st_mtime_ns, stat.st_size) != entry[:2]:
+                # Cambió la fecha o el tamaño: solo se descarta si el contenido es realmente distinto.
+                if hash_file(path) != entry[2]:
+                    del slf.entries[path]
+                    return None
+                entry = (stat.st_mtime_ns, stat.st_size, entry[2], entry[3])
+                slf.entries[path] = entry
+            slf.checked.add(path)
+
+        slf.hits += 1
+        return entry[3]
+
+    def store(slf, path, group):
+        stat = os.stat(path)
+        slf.entries[path] = (stat.st_mtime_ns, stat.st_size, hash_file(path), group)
+        slf.checked.add(path)
+        slf.misses += 1
+
+    def stats(slf):
+        return {"hits": slf.hits, "misses": slf.misses, "entries": len(slf.entries)}
+
+
+skin_cache = SkinCache()
+
+
+def load_skin_group(path):
+    # Devuelve el grupo de reportlab con el dibujo de la skin "path", leyéndolo y dibujándolo con svglib
+    # solo la primera vez en el proceso. Devuelve None si la skin no existe.
+    group = skin_cache.lookup(path)
+    if group is None:
+        if not os.access(path, os.R_OK):
+            return None
+        load_dependencies()
+        group = Group()
+        SvgRenderer(path).renderNode(NodeTracker.from_xml_root(load_svg_file(path)), parent=group)
+        skin_cache.store(path, group)
+    return group
+
+
+def skin_bounds(href):
+    # Caja (x0, y0, x1, y1) de lo que dibuja la skin "href" (ruta relativa a la carpeta del programa),
+    # relativa al punto donde se ubica. Muchas skins dibujan fuera de su viewBox, así que la caja sale del
+    # dibujo de svglib. Devuelve (0, 0, 0, 0) si la skin no existe.
+    if href is None:
+        return (0, 0, 0, 0)
+    group = load_skin_group(os.path.normpath(os.path.join(root_dir, href)))
+    if group is None or not group.contents:
+        return (0, 0, 0, 0)
+    return tuple(group.getBounds())
+
+
+def define_skin_renderer_class():
+    # Igual que SkinSymbol, se define cuando se importa svglib.
+    global SkinRenderer
+
+    class SkinRenderer(SvgRenderer):
+        # Renderer de svglib que resuelve las <image> que apuntan a una skin .svg a través de "skin_cache".
+        # El resto de los nodos se dibuja igual que en svglib.
+        def renderNode(slf, node, parent=None):
+            if parent is None:
+                return super().renderNode(node, parent)
+            name = node.tag.split('}')[-1]
+            if name == 'use':
+                return slf.render_skin_use(node, parent)
+            if name != 'image':
+                return super().renderNode(node, parent)
+
+            href = node.attrib.get('{http://www.w3.org/1999/xlink}href') or node.attrib.get('href')
+            if not href or '#' in href or not href.endswith('.svg'):
+                return super().renderNode(node, parent)
+
+            # Misma resolución de rutas que svglib: relativa a la carpeta del svg que se está leyendo.
+            path = os.path.normpath(os.path.join(os.path.dirname(slf.source_path), href))
+            group = load_skin_group(path)
+            if group is None:
+                # La skin no existe o no se pudo leer: se ignora, igual que hace svglib.
+                return
+
+            # Cada instancia solo agrega su propia transformación alrededor del grupo compartido.
+            item = Group(group)
+            slf.apply_node_attr_to_group(node, item)
+            parent.add(item)
+
+        def render_skin_use(slf, node, parent):
+            # Las <use> que apuntan a una skin de <defs> reusan el grupo de "skin_cache" (o lo dibujan una sola
+            # vez por proceso). svglib copiaría y volvería a dibujar el nodo en cada instancia.
+            href = node.attrib.get(xlink_href) or node.attrib.get('href')
+            if not href or not href.startswith('#skin-'):
+                return super().renderNode(node, parent)
+
+            target = slf.xlink_href_target(node)
+            if not isinstance(target, tuple):
+                return
+            skin_node = target[1]
+            path = os.path.normpath(os.path.join(os.path.dirname(slf.source_path), skin_node.get('data-skin', '')))
+            group = skin_cache.lookup(path)
+            if group is None:
+                group = Group()
+                slf.renderNode(skin_node, parent=group)
+                skin_cache.store(path, group)
+
+            item = Group(group)
+            slf.apply_node_attr_to_group(node, item)
+            parent.add(item)
+
+
+def svg_to_drawing(dwg):
+    # Convierte el dibujo svg en memoria en un Drawing de reportlab, el mismo para el pdf y las vistas previas.
+    # Registrar la fuente LM Roman 10 (si todavía no se registró en este proceso)
+    register_fonts()
+
+    # Leer el dibujo SVG. Las skins se toman de la caché del proceso.
+    # El svg no existe en disco: se le da una ruta virtual en la carpeta del programa para que las
+    # referencias relativas a "Skins/..." se resuelvan igual que antes.
+    skin_cache.new_render()
+    svg_root = load_svg_file(io.BytesIO(dwg.tostring().encode('utf-8')))
+    return SkinRenderer(os.path.join(root_dir, 'circuito.svg')).render(svg_root)
+
+
+def svg_to_pdf(dwg, pdf_filename, copies=()):
+    # Convierte el dibujo svg en memoria a pdf. Solo el pdf final se escribe a disco. El dibujo de reportlab
+    # se arma una sola vez y se guarda también en cada pdf de "copies", cada uno con su título.
+    drawing = svg_to_drawing(dwg)
+
+    for filename in (pdf_filename, *copies):
+        # Crear el canvas PDF
+        c = new_canvas(filename)
+        # Dibujar el SVG en el PDF
+        renderPDF.draw(drawing, c, 0, 0)
+
+        # Guardar el PDF
+        c.showPage()
+        c.save()
+
+
+class CanvasElement:
+    # Elemento del backend "canvas". Guarda los mismos atributos que el elemento equivalente de svgwrite,
+    # así los componentes lo modifican igual (transform, rotate, attribs), y se dibuja al agregarlo.
+    def __init__(slf, kind, **attributes):
+        slf.kind = kind
+        slf.attribs = attributes
+
+    def __getitem__(slf, key):
+        return slf.attribs[key]
+
+    def __setitem__(slf, key, value):
+        slf.attribs[key] = value
+
+    def rotate(slf, angle, center=None):
+        # Igual que en svgwrite: la rotación se agrega al final de la transformación del elemento.
+        rotation = f"rotate({angle})" if center is None else f"rotate({angle},{center[0]},{center[1]})"
+        slf.attribs['transform'] = (slf.attribs.get('transform', '') + ' ' + rotation).strip()
+
+
+svg_converter = None
+
+
+def apply_svg_transform(c, transform):
+    # Aplica al canvas una transformación escrita como en el atributo "transform" de svg.
+    for name, args in re.findall(r'(\w+)\s*\(([^)]*)\)', transform):
+        values = [float(value) for value in re.split(r'[\s,]+', args.strip())]
+        if name == 'translate':
+            c.translate(values[0], values[1] if len(values) > 1 else 0)
+        elif name == 'scale':
+            c.scale(values[0], values[1] if len(values) > 1 else values[0])
+        elif name == 'rotate':
+            if len(values) == 3:
+                c.translate(values[1], values[2])
+                c.rotate(values[0])
+                c.translate(-values[1], -values[2])
+            else:
+                c.rotate(values[0])
+        elif name == 'matrix':
+            c.transform(*values)
+
+
+def svg_number(value):
+    # Número como lo escribe svgwrite con el perfil tiny: los float se redondean a 4 decimales.
+    if isinstance(value, float):
+        value = round(value, 4)
+    return str(value)
+
+
+def escape_attribute(text):
+    # Mismos reemplazos que hace ElementTree en los atributos.
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    if '"' in text:
+        text = text.replace('"', "&quot;")
+    if "\r" in text or "\n" in text or "\t" in text:
+        text = text.replace("\r", "&#13;").replace("\n", "&#10;").replace("\t", "&#09;")
+    return text
+
+
+def escape_text(text):
+    # Mismos reemplazos que hace ElementTree en el contenido de un elemento.
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+class SvgGroup(CanvasElement):
+    # Grupo <g> (o <defs>) de SvgWriter: guarda sus elementos hasta que el grupo se agrega al documento.
+    def __init__(slf, kind='g', **attributes):
+        super().__init__(kind, **attributes)
+        slf.elements = []
+
+    def add(slf, element):
+        slf.elements.append(element)
+        return element
+
+
+class SvgWriter:
+    # Backend "stream": escribe el svg sin armar el árbol de svgwrite ni validar cada atributo. Ofrece los
+    # mismos métodos que los componentes usan de SvgDrawing (text, line, polyline, circle, image, use, g,
+    # add, place_skin, defs, viewbox y tostring); cada elemento se pasa a texto al agregarlo y el documento
+    # queda como una lista de fragmentos. El resultado es el mismo svg que arma svgwrite, byte a byte.
+    def __init__(slf, size, min_text_size=0):
+        slf.size = size
+        slf.view_box = None
+        slf.min_text_size = min_text_size
+        slf.defs = SvgGroup('defs')
+        slf.body = []
+        # Cierre de los elementos vacíos, como lo escribe ElementTree.
+        slf.empty_end = " />"
+
+    def text(slf, text, insert, **extra):
+        return CanvasElement('text', text=text, insert=insert, **extra)
+
+    def line(slf, start, end, **extra):
+        return CanvasElement('line', start=start, end=end, **extra)
+
+    def polyline(slf, points, **extra):
+        return CanvasElement('polyline', points=points, **extra)
+
+    def circle(slf, center, r, **extra):
+        return CanvasElement('circle', center=center, r=r, **extra)
+
+    def image(slf, href, insert, **extra):
+        return CanvasElement('image', href=href, insert=insert, **extra)
+
+    def use(slf, href, **extra):
+        return CanvasElement('use', href=href, **extra)
+
+    def g(slf, **extra):
+        return SvgGroup(**extra)
+
+    def place_skin(slf, href, x, y, transform):
+        place_svg_skin(slf, href, x, y, transform)
+
+    def add(slf, element):
+        if (slf.min_text_size and isinstance(element, CanvasElement) and element.kind == 'text'
+                and text_size(element.attribs) < slf.min_text_size):
+            return element
+        slf.body.append(slf.element_xml(element))
+        return element
+
+    def viewbox(slf, minx=0, miny=0, width=0, height=0):
+        slf.view_box = (minx, miny, width, height)
+
+    def number(slf, value):
+        return svg_number(value)
+
+    def coordinate(slf, value):
+        # Posición de textos e imágenes: svgwrite la escribe sin redondear.
+        return str(value)
+
+    def attributes(slf, kind, attribs):
+        # Atributos finales de cada elemento; StandaloneSvgWriter los compacta.
+        return attribs
+
+    def root_attributes(slf):
+        return {"baseProfile": "tiny", "height": slf.size[1], "version": "1.2",
+                "viewBox": ",".join(str(value) for value in slf.view_box), "width": slf.size[0],
+                "xmlns": "http://www.w3.org/2000/svg", "xmlns:ev": "http://www.w3.org/2001/xml-events",
+                "xmlns:xlink": "http://www.w3.org/1999/xlink"}
+
+    def defs_xml(slf):
+        return slf.element_xml(slf.defs)
+
+    def element_xml(slf, element):
+        # Texto xml de un elemento, con los atributos en el mismo orden y formato que svgwrite.
+        if not isinstance(element, CanvasElement):
+            # Elementos de svgwrite (las skins de <defs>) se serializan con ElementTree.
+            return ET.tostring(element.get_xml(), encoding='unicode')
+
+        kind = element.kind
+        attribs = {}
+        extra = dict(element.attribs)
+        content = None
+        if kind == 'line':
+            (attribs['x1'], attribs['y1']), (attribs['x2'], attribs['y2']) = extra.pop('start'), extra.pop('end')
+        elif kind == 'polyline':
+            attribs['points'] = " ".join(f"{slf.number(x)},{slf.number(y)}" for x, y in extra.pop('points'))
+        elif kind == 'circle':
+            (attribs['cx'], attribs['cy']), attribs['r'] = extra.pop('center'), extra.pop('r')
+        elif kind == 'text':
+            x, y = extra.pop('insert')
+            attribs['x'], attribs['y'] = slf.coordinate(x), slf.coordinate(y)
+            content = extra.pop('text')
+        elif kind == 'image':
+            x, y = extra.pop('insert')
+            attribs['x'], attribs['y'] = slf.coordinate(x), slf.coordinate(y)
+            attribs['xlink:href'] = extra.pop('href')
+        elif kind == 'use':
+            attribs['xlink:href'] = extra.pop('href')
+        for key, value in extra.items():
+            attribs[key.rstrip('_').replace('_', '-')] = value
+
+        parts = ["<" + kind]
+        for key, value in sorted(slf.attributes(kind, attribs).items()):
+            if value is None:
+                continue
+            value = slf.number(value) if isinstance(value, (int, float)) else str(value)
+            if value:
+                parts.append(f'{key}="{escape_attribute(value)}"')
+        start = " ".join(parts)
+
+        if isinstance(element, SvgGroup):
+            children = "".join(slf.element_xml(child) for child in element.elements)
+            return f"{start}>{children}</{kind}>" if children else start + slf.empty_end
+        if content:
+            return f"{start}>{escape_text(content)}</{kind}>"
+        return start + slf.empty_end
+
+    def write(slf, file):
+        # Escribe el documento en un archivo de texto abierto, fragmento por fragmento.
+        root = slf.element_xml(SvgGroup('svg', **slf.root_attributes()))
+        file.write(root[:-len(slf.empty_end)] + ">")
+        file.write(slf.defs_xml())
+        for fragment in slf.body:
+            file.write(fragment)
+        file.write("</svg>")
+
+    def tostring(slf):
+        output = io.StringIO()
+        slf.write(output)
+        return output.getvalue()
+
+
+def precision_number(value, precision):
+    # Número con a lo sumo "precision" decimales, sin ceros ni punto sobrantes.
+    text = f"{float(value):.{precision}f}"
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return "0" if text == "-0" else text
+
+
+def short_color(value):
+    # Color en la forma más corta: "black", "#000000" y "rgb(0%,0%,0%)" se escriben "#000".
+    color = svg_converter.convertColor(value) if value != 'none' else None
+    if color is None:
+        return value
+    digits = color.hexval()[2:].lower()
+    if digits[0] == digits[1] and digits[2] == digits[3] and digits[4] == digits[5]:
+        digits = digits[::2]
+    return '#' + digits
+
+
+# Atributos que StandaloneSvgWriter pasa a clases (en este orden) y sus valores por defecto, que se omiten.
+hoisted_attributes = ("fill", "stroke", "stroke-width", "stroke-linecap", "stroke-linejoin", "stroke-miterlimit",
+                      "stroke-dasharray", "font-size", "text-anchor")
+default_attributes = {("fill", "#000"), ("text-anchor", "start")}
+
+
+def class_name(number):
+    # Nombres cortos para las clases: a, b, ..., z, ba, bb, ...
+    name = ""
+    while True:
+        name = "abcdefghijklmnopqrstuvwxyz"[number % 26] + name
+        number //= 26
+        if not number:
+            return name
+
+
+def skin_inline_xml(symbol):
+    # La skin de un SkinSymbol lista para un svg independiente: sin metadatos de editores ni atributos con
+    # otros namespaces, con el css compactado y visible fuera de su viewBox, igual que al dibujarla en el pdf.
+    root = copy.deepcopy(symbol.skin_root)
+    for parent in root.iter():
+        for child in list(parent):
+            if not isinstance(child.tag, str) or child.tag.startswith('{') or child.tag == 'metadata':
+                parent.remove(child)
+    for element in root.iter():
+        for key in list(element.attrib):
+            if key == xlink_href:
+                element.set('xlink:href', element.attrib.pop(key))
+            elif key.startswith('{') or key == 'data-name':
+                del element.attrib[key]
+        if element.tag == 'style' and element.text:
+            text = re.sub(r'\s*([{};:,])\s*', r'\1', " ".join(element.text.split()))
+            element.text = text.replace(';}', '}')
+    root.attrib.pop('version', None)
+    root.set('overflow', 'visible')
+    skin = ET.tostring(root, encoding='unicode').replace(" />", "/>")
+    return f'<g id="{escape_attribute(symbol.attribs["id"])}">{skin}</g>'
+
+
+class StandaloneSvgWriter(SvgWriter):
+    # Svg independiente y compacto (--format svg): cada skin se incluye una sola vez en <defs> y los
+    # componentes son <use>; las coordenadas llevan a lo sumo "precision" decimales; la fuente se aplica
+    # una vez, por su nombre, en el elemento raíz; y los atributos de trazo y de texto que se repiten
+    # quedan en clases de un único <style>.
+    def __init__(slf, size, precision=2, font_family=None):
+        super().__init__(size)
+        slf.precision = precision
+        slf.font_family = font_family
+        # Combinación de atributos -> nombre de la clase.
+        slf.classes = {}
+        slf.empty_end = "/>"
+
+    def number(slf, value):
+        return precision_number(value, slf.precision)
+
+    def coordinate(slf, value):
+        return precision_number(value, slf.precision)
+
+    def attributes(slf, kind, attribs):
+        style = []
+        for key in hoisted_attributes:
+            value = attribs.pop(key, None)
+            if value is None:
+                continue
+            if key in ("fill", "stroke"):
+                value = short_color(value)
+            elif isinstance(value, (int, float)):
+                value = slf.number(value) + ("px" if key == "stroke-width" else "")
+            if (key, value) not in default_attributes:
+                style.append((key, str(value)))
+        if style:
+            style = tuple(style)
+            if style not in slf.classes:
+                slf.classes[style] = class_name(len(slf.classes))
+            attribs['class'] = slf.classes[style]
+        if attribs.get('font-family') == font:
+            del attribs['font-family']
+        if 'transform' in attribs:
+            # Las rotaciones de 0 grados no cambian nada.
+            attribs['transform'] = re.sub(r'\s*rotate\(-?0(\.0*)?(,[^)]*)?\)', '', attribs['transform']).strip()
+        return attribs
+
+    def element_xml(slf, element):
+        if isinstance(element, SkinSymbol):
+            return skin_inline_xml(element)
+        return super().element_xml(element)
+
+    def root_attributes(slf):
+        return {"font-family": slf.font_family, "height": slf.number(slf.size[1]),
+                "viewBox": " ".join(slf.number(value) for value in slf.view_box), "width": slf.number(slf.size[0]),
+                "xmlns": "http://www.w3.org/2000/svg", "xmlns:xlink": "http://www.w3.org/1999/xlink"}
+
+    def defs_xml(slf):
+        rules = "".join("." + name + "{" + ";".join(f"{key}:{value}" for key, value in style) + "}"
+                        for style, name in slf.classes.items())
+        content = (f"<style>{escape_text(rules)}</style>" if rules else "") + "".join(
+            slf.element_xml(element) for element in slf.defs.elements)
+        return f"<defs>{content}</defs>" if content else ""
+
+
+def create_standalone_svg(wires, lines, components, comments, precision=None):
+    # Arma el svg independiente del circuito actual (ver StandaloneSvgWriter). "precision" es la cantidad
+    # de decimales de las coordenadas; por defecto, la de "render_options".
+    global skin_symbols
+    register_fonts()
+    family = pdfmetrics.getFont(font).face.familyName
+    if isinstance(family, bytes):
+        family = family.decode('latin-1')
+    if precision is None:
+        precision = render_options["precision"]
+    dwg = StandaloneSvgWriter(windowsize, precision, f"'{family}',serif")
+    skin_symbols = {}
+    draw_circuit(dwg, wires, lines, components, comments, sheet_frame())
+    dwg.viewbox(minx, miny, windowsize[0], windowsize[1])
+    return dwg
+
+
+def standalone_svg(wires, lines, components, comments, compress=False):
+    # Bytes del svg independiente; con "compress", comprimido con gzip (.svgz). El gzip no guarda la fecha,
+    # así el mismo circuito da siempre el mismo archivo.
+    data = create_standalone_svg(wires, lines, components, comments).tostring().encode('utf-8')
+    return gzip.compress(data, mtime=0) if compress else data
+
+
+class CanvasDrawing:
+    # Backend que dibuja el circuito directamente sobre un canvas de reportlab, sin armar el svg.
+    # Ofrece los mismos métodos que los componentes usan de SvgDrawing (text, line, polyline, circle,
+    # add y place_skin). Cada skin se guarda una sola vez en el pdf como un Form XObject y cada
+    # componente es una referencia a ese form con su propia transformación.
+    def __init__(slf, c, viewbox, forms=None):
+        slf.canvas = c
+        # Ruta de la skin -> nombre del form en el pdf (None si la skin no existe).
+        slf.forms = {} if forms is None else forms
+        x, y, width, height = viewbox
+        # Misma transformación que aplica svglib al svg completo: 1px = 0.75pt y el eje y invertido.
+        c.transform(PX_TO_PT, 0, 0, -PX_TO_PT, -PX_TO_PT * x, PX_TO_PT * (height + y))
+
+    def text(slf, text, insert, **extra):
+        return CanvasElement('text', text=text, insert=insert, **extra)
+
+    def line(slf, start, end, **extra):
+        return CanvasElement('line', start=start, end=end, **extra)
+
+    def polyline(slf, points, **extra):
+        return CanvasElement('polyline', points=points, **extra)
+
+    def circle(slf, center, r, **extra):
+        return CanvasElement('circle', center=center, r=r, **extra)
+
+    def add(slf, element):
+        # Las skins no pasan por acá: los componentes las dibujan con place_skin.
+        attribs = element.attribs
+        c = slf.canvas
+        c.saveState()
+        apply_svg_transform(c, attribs.get('transform', ''))
+        if element.kind == 'text':
+            slf.draw_text(attribs)
+        else:
+            slf.draw_shape(element.kind, attribs)
+        c.restoreState()
+
+    def place_skin(slf, href, x, y, transform):
+        # Dibuja la skin "href" del componente ubicado en (x, y) con la orientación "transform".
+        form = slf.skin_form(href)
+        if form is None:
+            return
+        c = slf.canvas
+        c.saveState()
+        # La matriz (a, b, c, d) de la orientación lleva (u, v) a (a u + b v, c u + d v); reportlab
+        # usa el orden de pdf (a, c, b, d, x, y).
+        m11, m12, m21, m22 = transform.matrix
+        c.transform(m11, m21, m12, m22, x, y)
+        c.doForm(form)
+        c.restoreState()
+
+    def skin_form(slf, href):
+        # Nombre del form con la skin "href", definiéndolo la primera vez que se usa en el documento.
+        path = os.path.normpath(os.path.join(root_dir, href))
+        if path not in slf.forms:
+            group = load_skin_group(path)
+            if group is None:
+                slf.forms[path] = None
+            else:
+                name = "skin-" + re.sub(r'[^A-Za-z0-9_-]', '_', os.path.splitext(os.path.basename(path))[0])
+                # Caja del form con margen amplio para que no se recorte el ancho de los trazos.
+                x0, y0, x1, y1 = group.getBounds()
+                margin = max(x1 - x0, y1 - y0)
+                c = slf.canvas
+                c.beginForm(name, x0 - margin, y0 - margin, x1 + margin, y1 + margin)
+                renderPDF.draw(Drawing(0, 0, group), c, 0, 0)
+                c.endForm()
+                slf.forms[path] = name
+        return slf.forms[path]
+
+    def draw_text(slf, attribs):
+        c = slf.canvas
+        # Mismo tratamiento de espacios que svglib: se recortan los extremos y se juntan los repetidos.
+        text = clean_text(attribs['text'], False, strip_start=True, strip_end=True)
+        if not text:
+            return
+        font_name = attribs.get('font_family', font)
+        size = svg_converter.convertLength(attribs.get('font_size', fontSize))
+        x, y = attribs['insert']
+        anchor = attribs.get('text_anchor', 'start')
+        if anchor == 'end':
+            x -= pdfmetrics.stringWidth(text, font_name, size)
+        elif anchor == 'middle':
+            x -= pdfmetrics.stringWidth(text, font_name, size) / 2
+
+        c.setFont(font_name, size)
+        c.setFillColor(svg_converter.convertColor(attribs.get('fill', 'black')))
+        # El texto se escribe con el eje y derecho, como hace svglib.
+        c.scale(1, -1)
+        c.drawString(x, -y, text)
+
+    def draw_shape(slf, kind, attribs):
+        c = slf.canvas
+        stroke = 'stroke' in attribs
+        if stroke:
+            c.setStrokeColor(svg_converter.convertColor(attribs['stroke']))
+            c.setLineWidth(float(attribs.get('stroke_width', 1)))
+            c.setLineCap(svg_converter.convertLineCap(attribs.get('stroke_linecap', 'butt')))
+            c.setLineJoin(svg_converter.convertLineJoin(attribs.get('stroke_linejoin', 'miter')))
+            c.setMiterLimit(float(attribs.get('stroke_miterlimit', 4)))
+            if 'stroke_dasharray' in attribs:
+                c.setDash(svg_converter.convertDashArray(attribs['stroke_dasharray']))
+        fill = attribs.get('fill', 'black') != 'none'
+        if fill:
+            c.setFillColor(svg_converter.convertColor(attribs.get('fill', 'black')))
+
+        if kind == 'line':
+            if stroke:
+                c.line(*attribs['start'], *attribs['end'])
+        elif kind == 'polyline':
+            points = attribs['points']
+            path = c.beginPath()
+            path.moveTo(*points[0])
+            for point in points[1:]:
+                path.lineTo(*point)
+            c.drawPath(path, stroke=int(stroke), fill=int(fill))
+        elif kind == 'circle':
+            c.circle(*attribs['center'], attribs['r'], stroke=int(stroke), fill=int(fill))
+
+
+class RecordingDrawing(CanvasDrawing):
+    # Backend que no dibuja nada: guarda en orden lo que se le agrega para dibujarlo después sobre un
+    # CanvasDrawing (ver create_bundle). Las skins se leen al guardarlas, así un error de la hoja aparece
+    # antes de tocar el pdf.
+    def __init__(slf):
+        slf.operations = []
+
+    def add(slf, element):
+        slf.operations.append(('add', (element,)))
+
+    def place_skin(slf, href, x, y, transform):
+        load_skin_group(os.path.normpath(os.path.join(root_dir, href)))
+        slf.operations.append(('place_skin', (href, x, y, transform)))
+
+    def replay(slf, dwg):
+        for method, arguments in slf.operations:
+            getattr(dwg, method)(*arguments)
+
+
+class BoundsDrawing(CanvasDrawing):
+    # Backend que no dibuja nada: acumula la caja (x0, y0, x1, y1) de todo lo que se le agrega, con el
+    # ancho de los trazos y el tamaño real de los textos y de las skins.
+    def __init__(slf):
+        slf.box = None
+
+    def extend(slf, points, margin=0):
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        box = (min(xs) - margin, min(ys) - margin, max(xs) + margin, max(ys) + margin)
+        if slf.box is not None:
+            box = (min(box[0], slf.box[0]), min(box[1], slf.box[1]), max(box[2], slf.box[2]), max(box[3], slf.box[3]))
+        slf.box = box
+
+    def add(slf, element):
+        attribs = element.attribs
+        if element.kind == 'text':
+            text = clean_text(attribs['text'], False, strip_start=True, strip_end=True)
+            if not text:
+                return
+            size = svg_converter.convertLength(attribs.get('font_size', fontSize))
+            width = pdfmetrics.stringWidth(text, attribs.get('font_family', font), size)
+            x, y = attribs['insert']
+            x -= {'end': width, 'middle': width / 2}.get(attribs.get('text_anchor', 'start'), 0)
+            points = [(x, y - size), (x + width, y - size), (x, y + size / 4), (x + width, y + size / 4)]
+            # Los textos solo se rotan (ver add_text y add_comment).
+            for angle, cx, cy in re.findall(r'rotate\(([-\d.]+),([-\d.]+),([-\d.]+)\)', attribs.get('transform', '')):
+                angle, cx, cy = math.radians(float(angle)), float(cx), float(cy)
+                cos, sin = math.cos(angle), math.sin(angle)
+                points = [(cx + (px - cx) * cos - (py - cy) * sin, cy + (px - cx) * sin + (py - cy) * cos)
+                          for px, py in points]
+            slf.extend(points)
+        elif element.kind == 'circle':
+            slf.extend([attribs['center']], attribs['r'])
+        else:
+            points = attribs['points'] if element.kind == 'polyline' else [attribs['start'], attribs['end']]
+            slf.extend(points, float(attribs.get('stroke_width', 1)) / 2)
+
+    def place_skin(slf, href, x, y, transform):
+        x0, y0, x1, y1 = skin_bounds(href)
+        slf.extend(transform.transform_points([(x0, y0), (x1, y0), (x0, y1), (x1, y1)], x, y))
+
+
+# Margen alrededor del dibujo cuando el marco se ajusta al contenido (esquemáticos sin rectángulo).
+frame_margin = 16
+
+
+def fit_frame(wires, lines, components, comments):
+    # Ajusta el marco de un esquemático sin rectángulo a lo que ocupa su dibujo, con "frame_margin" de cada
+    # lado. Deja el origen en "minx" y "miny" y devuelve el tamaño. Una hoja vacía usa un marco de 10000x10000.
+    global minx
+    global miny
+    load_dependencies()
+    register_fonts()
+    measure = BoundsDrawing()
+    draw_circuit(measure, wires, lines, components, comments)
+    if measure.box is None:
+        minx = miny = -5000
+        return (10000, 10000)
+    x0, y0, x1, y1 = measure.box
+    minx = math.floor(x0) - frame_margin
+    miny = math.floor(y0) - frame_margin
+    return (math.ceil(x1) + frame_margin - minx, math.ceil(y1) + frame_margin - miny)
+
+
+def create_circuit_pdf(wires, lines, components, comments, pdf_filename):
+    # Dibuja el circuito directamente en el pdf, sin pasar por svg.
+    global skin_symbols
+    register_fonts()
+    skin_cache.new_render()
+    skin_symbols = None
+
+    c = new_canvas(pdf_filename)
+    draw_circuit(CanvasDrawing(c, (minx, miny, windowsize[0], windowsize[1])), wires, lines, components, comments,
+                 sheet_frame())
 
-    # Guardar el PDF
     c.showPage()
     c.save()
 
 
-# Ejemplo de uso
+def create_bundle(asc_filenames, pdf_filename):
+    # Convierte varios .asc en un único pdf, con una página por esquemático del tamaño de su rectángulo.
+    # Las skins (forms) y la fuente se embeben una sola vez y las comparten todas las páginas. Cada página
+    # se dibuja y se cierra apenas se procesa su archivo, sin guardar los circuitos anteriores.
+    # Devuelve la cantidad de páginas agregadas.
+    global windowsize
+    global skin_symbols
+    register_fonts()
+    skin_cache.new_render()
+    skin_symbols = None
+
+    c = None
+    forms = {}
+    pages = 0
+    failed_files.clear()
+    for asc_filename in asc_filenames:
+        name = os.path.splitext(os.path.basename(asc_filename))[0]
+        print(f"Agregando {name}...")
+        try:
+            wires, lines, components, comments, windowsize = parse_asc_file(asc_filename)
+            wires = normalize_wires(wires)
+            if windowsize is None:
+                windowsize = fit_frame(wires, lines, components, comments)
+            # La hoja se dibuja primero aparte y se pasa al pdf solo si no falló: igual que en convert_tree,
+            # un archivo con errores se informa y se sigue con el resto, sin dejar una página a medias.
+            sheet = RecordingDrawing()
+            draw_circuit(sheet, wires, lines, components, comments, sheet_frame())
+        except Exception:
+            print(f"Error al convertir {asc_filename}:\n{traceback.format_exc()}")
+            failed_files.append(asc_filename)
+            continue
+
+        if c is None:
+            c = new_canvas(pdf_filename)
+        else:
+            c.setPageSize(windowsize)
+        c.saveState()
+        sheet.replay(CanvasDrawing(c, (minx, miny, windowsize[0], windowsize[1]), forms))
+        c.restoreState()
+        # Un marcador por figura para ubicarla desde el índice del visor.
+        c.bookmarkPage(f"figura{pages}")
+        c.addOutlineEntry(name, f"figura{pages}")
+        c.showPage()
+        pages += 1
+
+    if pages:
+        c.save()
+    return pages
+
+
+# Eventos de inotify (ver inotify(7)).
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ISDIR = 0x40000000
+
+
+class InotifyWatcher:
+    # Vigila carpetas (y sus subcarpetas) con inotify, a través de la libc. Solo existe en Linux.
+    def __init__(slf, folders):
+        slf.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        slf.fd = slf.libc.inotify_init1(os.O_NONBLOCK)
+        if slf.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        slf.folders = {}
+        for folder in folders:
+            for root, dirs, files in os.walk(folder):
+                dirs[:] = [d for d in dirs if d != ".git"]
+                slf.add_watch(root)
+
+    def add_watch(slf, folder):
+        mask = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        wd = slf.libc.inotify_add_watch(slf.fd, os.fsencode(folder), mask)
+        if wd >= 0:
+            slf.folders[wd] = folder
+
+    def wait(slf, timeout=None):
+        # Espera hasta "timeout" segundos (o indefinidamente) y devuelve las rutas de los archivos
+        # que cambiaron. Un conjunto vacío significa que no hubo cambios en ese tiempo.
+        ready, _, _ = select.select([slf.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(slf.fd, 1 << 16)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        # Cada evento es una estructura inotify_event: wd, mask, cookie, len y el nombre.
+        while offset + 16 <= len(data):
+            wd, mask, cookie, length = struct.unpack_from('iIII', data, offset)
+            name = data[offset + 16:offset + 16 + length].rstrip(b'\0')
+            offset += 16 + length
+            folder = slf.folders.get(wd)
+            if folder is None or not name:
+                continue
+            path = os.path.join(folder, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                # Las carpetas nuevas también se vigilan.
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    slf.add_watch(path)
+                continue
+            changed.add(path)
+        return changed
+
+
+class PollingWatcher:
+    # Alternativa a inotify para los demás sistemas: compara la fecha y el tamaño de cada archivo
+    # cada "interval" segundos.
+    def __init__(slf, folders, interval=0.25):
+        slf.folders = folders
+        slf.interval = interval
+        slf.snapshot = slf.scan()
+
+    def scan(slf):
+        files = {}
+        for folder in slf.folders:
+            for root, dirs, names in os.walk(folder):
+                dirs[:] = [d for d in dirs if d != ".git"]
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files[path] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def wait(slf, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = slf.interval if deadline is None else max(0, min(slf.interval, deadline - time.monotonic()))
+            time.sleep(delay)
+            snapshot = slf.scan()
+            changed = {path for path in snapshot.keys() | slf.snapshot.keys()
+                       if snapshot.get(path) != slf.snapshot.get(path)}
+            slf.snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+
+def make_watcher(folders):
+    # inotify en Linux; si no está disponible, se revisan las carpetas periódicamente.
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(folders)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(folders)
+
+
+def rerender_changed(changed, cache, input_dir, output_dir, format="pdf"):
+    # Vuelve a convertir solo los pdf afectados por los archivos que cambiaron: los .asc modificados,
+    # los que usan una skin modificada y todos si cambió la fuente o la tabla de símbolos. Devuelve
+    # (archivos convertidos, True si cambió la caché), porque la caché también cambia cuando un pdf sigue
+    # siendo válido y solo se actualiza su clave.
+    global fonts_registered
+    global symbol_table
+    changed = {os.path.normpath(path) for path in changed}
+    font_changed = os.path.normpath(font_path) in changed
+    if font_changed:
+        # La fuente nueva se vuelve a registrar en la próxima conversión.
+        fonts_registered = False
+    if os.path.normpath(os.path.join(skins_dir, 'symbols.json')) in changed:
+        # La tabla de símbolos se vuelve a leer y todas las figuras se redibujan.
+        symbol_table = None
+        font_changed = True
+    skins_changed = {path for path in changed if path.startswith(os.path.normpath(skins_dir) + os.sep)}
+    if skins_changed or font_changed:
+        # Los marcos ajustados al dibujo (esquemáticos sin rectángulo) dependen de las skins y de la fuente.
+        parsed_models.clear()
+
+    deps = output_digest(format)
+    converted = 0
+    dirty = False
+    for asc_filename, pdf_filename in collect_jobs(input_dir, output_dir, format):
+        name = cache_entry_name(pdf_filename, output_dir)
+        key = hashlib.sha256((deps + hash_file(asc_filename)).encode()).hexdigest()
+        entry = cache.get(name)
+        if entry and entry.get("key") == key and os.path.exists(pdf_filename):
+            continue
+
+        skins = skins_by_file.get(asc_filename)
+        if (entry and os.path.exists(pdf_filename) and not font_changed and skins is not None
+                and os.path.normpath(asc_filename) not in changed and skins.isdisjoint(skins_changed)):
+            # Solo cambiaron skins que este archivo no usa: el pdf sigue siendo válido.
+            entry["key"] = key
+            dirty = True
+            continue
+
+        print(f"Convirtiendo {os.path.basename(asc_filename)}...")
+        error = run_job((asc_filename, pdf_filename, ()))[1]
+        if asc_filename in failed_files:
+            failed_files.remove(asc_filename)
+        if error is not None:
+            print(f"Error al convertir {asc_filename}:\n{error}")
+            failed_files.append(asc_filename)
+            continue
+        cache[name] = {"key": key, "pdf": hash_file(pdf_filename)}
+        converted += 1
+        dirty = True
+    return converted, dirty
+
+
+def watch(cache, input_dir, output_dir, debounce=0.3, format="pdf"):
+    # Modo --watch: el proceso queda abierto (con las librerías, la fuente y las skins ya cargadas) y
+    # vuelve a convertir lo que cambie en ASC_Files/, Skins/ o fonts/.
+    folders = [input_dir, os.path.dirname(skins_dir), os.path.dirname(font_path)]
+    watcher = make_watcher([folder for folder in folders if os.path.isdir(folder)])
+    print(f"Esperando cambios en {', '.join(os.path.relpath(folder) for folder in folders)} (Ctrl+C para salir)...")
+    try:
+        while True:
+            changed = watcher.wait()
+            # LTspice guarda el archivo en varias escrituras: se espera a que deje de cambiar.
+            while True:
+                more = watcher.wait(debounce)
+                if not more:
+                    break
+                changed |= more
+
+            start = time.perf_counter()
+            converted, dirty = rerender_changed(changed, cache, input_dir, output_dir, format)
+            if dirty:
+                save_cache(cache, output_dir)
+            if converted:
+                print(f"{converted} archivos convertidos en {time.perf_counter() - start:.2f} s.")
+    except KeyboardInterrupt:
+        pass
+
 
 # Directorios de entrada y salida
 input_dir = 'ASC_Files'
 output_dir = 'PDFs'
-root_dir = os.getcwd()  # Directorio raíz del programa
-
-
-
-if not os.path.exists(output_dir):
-    os.mkdir(output_dir)
-
-cant_archivos = 0
-# Recorre todos los archivos .asc en la carpeta actual
-for file_name in os.listdir(input_dir):
-    if file_name.endswith('.asc'):
-        asc_filename = os.path.join(input_dir, file_name)
-        pdf_filename = os.path.join(
-            output_dir, file_name.replace('.asc', '.pdf'))
-        
-        if os.path.exists(pdf_filename):
-            asc_mtime = os.path.getmtime(asc_filename)
-            pdf_mtime = os.path.getmtime(pdf_filename)
-            if pdf_mtime >= asc_mtime:
-                # print(f"Saltando {file_name} (PDF actualizado)")
-                continue  # Sale del bucle de archivos en esta carpeta 
-        cant_archivos += 1
-        print(f"Convirtiendo {file_name}...")
-
-        svg_filename = os.path.join(
-            root_dir, file_name.replace('.asc', '.svg'))
-        modified_svg_filename = os.path.join(
-            root_dir, file_name.replace('.asc', '_modified.svg'))
-        fitted_svg_filename = os.path.join(
-            root_dir, file_name.replace('.asc', '_fitted.svg'))
-
-        # Procesa el archivo .asc
-        wires, lines, components, comments, windowsize = parse_asc_file(asc_filename)
-        create_circuit_svg(svg_filename, wires, lines, components, comments)
-        modify_svg_font(
-            svg_filename, modified_svg_filename, 'LM_Roman_10')
-        svg_to_pdf(modified_svg_filename, pdf_filename)
-
-        # Elimina los archivos SVG generados
-        if os.path.exists(svg_filename):
-            os.remove(svg_filename)
-        if os.path.exists(modified_svg_filename):
-            os.remove(modified_svg_filename)
-
-# Recorre todas las carpetas en el directorio de entrada
-for root, dirs, files in os.walk(input_dir):
-
-    # Filtra y elimina las carpetas que quieres ignorar
-    dirs[:] = [d for d in dirs if d != ".git"]
-
-    for dir_name in dirs:
-        input_folder = os.path.join(root, dir_name)
-        output_folder = os.path.join(
-            root.replace(input_dir, output_dir), dir_name)
-
-        # Crea la carpeta de salida si no existe
-        if not os.path.exists(output_folder):
-            os.makedirs(output_folder)
-
+# Manifiesto de la caché de conversiones, dentro de la carpeta de salida.
+cache_name = '.cache.json'
+
+fonts_registered = False
+# Skins usadas por cada .asc convertido en este proceso, para saber qué redibujar en --watch.
+used_skins = set()
+skins_by_file = {}
+# Tabla de símbolos de la carpeta de skins, compilada (ver load_symbol_table).
+symbol_table = None
+# Modelos parseados más recientes: sha256 del .asc -> (resultado de parse_asc_file, minx, miny).
+parsed_models = {}
+parsed_models_size = 64
+# Mediciones del archivo que se está convirtiendo (None si no se pidió --report ni --profile).
+file_report = None
+# Archivos con errores en la última corrida (convert_tree, create_bundle, convert_regions o create_previews);
+# main sale con código 1 si queda alguno.
+failed_files = []
+instrumentation = {"report": False, "profile_dir": None, "input_dir": input_dir}
+font_subset_cache = None
+# Caracteres no ASCII que se reservan en la fuente con "stable_font_subset" (todos existen en LM Roman 10).
+font_subset_seed = "ΩµΔ°±·×÷²³½¼áéíóúüñÁÉÍÓÚÜÑ¿¡"
+
+# Opciones de dibujo elegidas desde la línea de comandos. Se copian a cada proceso del pool.
+render_options = {
+    "backend": "svg",
+    "inline_skins": False,
+    "stable_font_subset": False,
+    # Decimales de las coordenadas del svg independiente (--format svg).
+    "precision": 2,
+}
+# Lo toma convert() mientras dibuja: el estado del dibujo es global al módulo.
+render_lock = threading.RLock()
+# Formatos de salida: el pdf o el svg independiente, comprimido o no.
+output_formats = ("pdf", "svg", "svgz")
+# Formas de dibujar el pdf (--backend).
+backends = ("svg", "stream", "canvas")
+
+
+def parse_asc_cached(source):
+    # Igual que parse_asc_file, pero guarda los últimos modelos parseados según el hash del contenido:
+    # un esquemático que se vuelve a pedir sin cambios (--watch, --serve) no se vuelve a parsear.
+    global minx
+    global miny
+    if isinstance(source, (bytes, bytearray)):
+        data = bytes(source)
+    else:
+        with open(source, 'rb') as file:
+            data = file.read()
+    key = hashlib.sha256(data).hexdigest()
+
+    model = parsed_models.pop(key, None)
+    if file_report is not None:
+        file_report["parsed_model_cached"] = model is not None
+    if model is None:
+        wires, lines, components, comments, windowsize = parse_asc_file(data)
+        if windowsize is None:
+            windowsize = fit_frame(normalize_wires(wires), lines, components, comments)
+        model = ((wires, lines, components, comments, windowsize), minx, miny)
+        if len(parsed_models) >= parsed_models_size:
+            # Se descarta el modelo usado hace más tiempo.
+            parsed_models.pop(next(iter(parsed_models)))
+    parsed_models[key] = model
+
+    result, minx, miny = model
+    return result
+
+
+def load_circuit(asc_filename):
+    # Lee el .asc (ruta o contenido en bytes) y devuelve (wires, lines, components, comments) listos para
+    # dibujar, dejando en "windowsize", "minx" y "miny" el marco del circuito.
+    global windowsize
+    load_dependencies()
+
+    # Procesa el archivo .asc
+    wires, lines, components, comments, windowsize = parse_asc_cached(asc_filename)
+    return normalize_wires(wires), lines, components, comments
+
+
+@contextlib.contextmanager
+def stage(name):
+    # Mide una etapa de la conversión del archivo actual y la guarda en "file_report": tiempo real, tiempo
+    # de CPU y, si tracemalloc está activo, el pico de memoria. Con "profile_dir" además guarda las
+    # estadísticas de cProfile de la etapa. Si no se está generando un reporte, no hace nada.
+    if file_report is None:
+        yield
+        return
+
+    profiler = None
+    if instrumentation["profile_dir"]:
+        import cProfile
+        profiler = cProfile.Profile()
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        record = {"wall_s": time.perf_counter() - wall, "cpu_s": time.process_time() - cpu}
+        if tracemalloc.is_tracing():
+            record["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        file_report["stages"][name] = record
+        if profiler is not None:
+            # Los perfiles siguen la estructura de carpetas de la entrada, así dos .asc con el mismo nombre
+            # en carpetas distintas no se pisan.
+            relative = os.path.relpath(file_report['file'], instrumentation["input_dir"])
+            profile = os.path.join(instrumentation["profile_dir"], f"{os.path.splitext(relative)[0]}.{name}.prof")
+            os.makedirs(os.path.dirname(profile), exist_ok=True)
+            profiler.dump_stats(profile)
+
+
+def convert_file(asc_filename, pdf_filename, copies=()):
+    # Convierte un único archivo .asc en un .pdf. Todas las etapas intermedias quedan en memoria.
+    # "asc_filename" también puede ser el contenido del .asc en bytes y "pdf_filename" un archivo abierto.
+    # "copies" son otros pdf de archivos idénticos al .asc: el circuito se lee y se dibuja una sola vez y
+    # se guarda en cada uno con su propio título.
+    with stage("parse"):
+        wires, lines, components, comments = load_circuit(asc_filename)
+    if isinstance(pdf_filename, str) and pdf_filename.endswith(('.svg', '.svgz')):
+        # --format svg: en lugar del pdf se escribe el svg independiente, que no lleva título.
+        with stage("svg"):
+            data = standalone_svg(wires, lines, components, comments, pdf_filename.endswith('.svgz'))
+        for filename in (pdf_filename, *copies):
+            with open(filename, 'wb') as file:
+                file.write(data)
+    elif render_options["backend"] == "canvas":
+        # El canvas no guarda un modelo del dibujo: cada copia se vuelve a dibujar, sin volver a leer el .asc.
+        with stage("canvas"):
+            for filename in (pdf_filename, *copies):
+                create_circuit_pdf(wires, lines, components, comments, filename)
+    else:
+        with stage("svg"):
+            dwg = create_circuit_svg(wires, lines, components, comments)
+        with stage("pdf"):
+            svg_to_pdf(dwg, pdf_filename, copies)
+    if not isinstance(asc_filename, (bytes, bytearray)):
+        skins_by_file[asc_filename] = used_skins
+    if file_report is not None:
+        file_report.update({"components": len(components), "wires": len(wires), "lines": len(lines),
+                            "comments": len(comments), "skins": len(used_skins)})
+
+
+def apply_options(options):
+    # Aplica opciones de dibujo a "render_options" y devuelve los valores anteriores para restaurarlos.
+    unknown = set(options) - set(render_options)
+    if unknown:
+        raise TypeError(f"Opciones desconocidas: {', '.join(sorted(unknown))}")
+    previous = dict(render_options)
+    render_options.update(options)
+    return previous
+
+
+def convert(asc, format="pdf", **options):
+    # Convierte un esquemático y devuelve el pdf (o el svg, con format="svg" o "svgz") en bytes, sin escribir
+    # nada a disco. "asc" es la ruta del .asc o su contenido en bytes; las opciones son las de "render_options"
+    # (backend, inline_skins, ...). El dibujo usa el estado del módulo (marco, skins usadas, opciones), así
+    # que las conversiones de distintos hilos se hacen de a una.
+    if format not in output_formats:
+        raise ValueError(f"Formato desconocido: {format}")
+    with render_lock:
+        previous = apply_options(options)
+        try:
+            if format in ("svg", "svgz"):
+                # El svg es independiente (con las skins incluidas), porque quien lo pide no tiene la carpeta Skins/.
+                return standalone_svg(*load_circuit(asc), compress=format == "svgz")
+            output = io.BytesIO()
+            convert_file(asc, output)
+            return output.getvalue()
+        finally:
+            render_options.update(previous)
+
+
+def collect_jobs(input_dir, output_dir, format="pdf"):
+    # Devuelve la lista de pares (asc, pdf) de todos los esquemáticos, primero los de la carpeta principal
+    # y después los de cada subcarpeta. Crea las carpetas de salida que falten. Con "format" el archivo de
+    # salida es un .svg o .svgz en lugar del pdf.
+    jobs = []
+
+    if not os.path.exists(output_dir):
+        os.mkdir(output_dir)
+
+    folders = [(input_dir, output_dir)]
+    # Recorre todas las carpetas en el directorio de entrada
+    for root, dirs, files in os.walk(input_dir):
+        # Filtra y elimina las carpetas que quieres ignorar
+        dirs[:] = [d for d in dirs if d != ".git"]
+
+        for dir_name in dirs:
+            output_folder = os.path.join(
+                root.replace(input_dir, output_dir), dir_name)
+            # Crea la carpeta de salida si no existe
+            if not os.path.exists(output_folder):
+                os.makedirs(output_folder)
+            folders.append((os.path.join(root, dir_name), output_folder))
+
+    for input_folder, output_folder in folders:
         # Recorre todos los archivos .asc en la carpeta actual
         for file_name in os.listdir(input_folder):
             if file_name.endswith('.asc'):
                 asc_filename = os.path.join(input_folder, file_name)
                 pdf_filename = os.path.join(
-                    output_folder, file_name.replace('.asc', '.pdf'))
-                
-                if os.path.exists(pdf_filename):
-                    asc_mtime = os.path.getmtime(asc_filename)
-                    pdf_mtime = os.path.getmtime(pdf_filename)
-                    if pdf_mtime >= asc_mtime:
-                        # print(f"Saltando {file_name} (PDF actualizado)")
-                        continue  # Sale del bucle de archivos en esta carpeta    
+                    output_folder, file_name.replace('.asc', '.' + format))
+                jobs.append((asc_filename, pdf_filename))
+
+    return jobs
+
+
+def collect_bundle_files(folder, order="path"):
+    # Devuelve los .asc de "folder" y sus subcarpetas en el orden de las páginas del pdf conjunto.
+    # "path": por ruta relativa; "name": por nombre de archivo; "mtime": del más viejo al más nuevo.
+    # Los empates se resuelven por ruta, así el orden es siempre el mismo.
+    asc_filenames = []
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = [d for d in dirs if d != ".git"]
+        for file_name in files:
+            if file_name.endswith('.asc'):
+                asc_filenames.append(os.path.join(root, file_name))
+
+    def relative(asc_filename):
+        return os.path.relpath(asc_filename, folder).replace(os.sep, '/')
+
+    if order == "name":
+        asc_filenames.sort(key=lambda asc_filename: (os.path.basename(asc_filename), relative(asc_filename)))
+    elif order == "mtime":
+        asc_filenames.sort(key=lambda asc_filename: (os.path.getmtime(asc_filename), relative(asc_filename)))
+    else:
+        asc_filenames.sort(key=relative)
+    return asc_filenames
+
+
+def hash_file(filename):
+    # Devuelve el sha256 del contenido de un archivo.
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dependencies_digest():
+    # Hash de todo lo que, además del .asc, influye en el pdf: la versión del conversor,
+    # la fuente y cada skin de la carpeta de skins (nombre y contenido).
+    digest = hashlib.sha256()
+    digest.update(CONVERTER_VERSION.encode())
+    digest.update(hash_file(font_path).encode())
+    for skin_name in sorted(os.listdir(skins_dir)):
+        skin_filename = os.path.join(skins_dir, skin_name)
+        if os.path.isfile(skin_filename):
+            digest.update(skin_name.encode('utf-8'))
+            digest.update(hash_file(skin_filename).encode())
+    return digest.hexdigest()
+
+
+# Opciones de "render_options" que cambian el archivo de salida de cada formato.
+output_options = {
+    "pdf": ("backend", "inline_skins", "stable_font_subset"),
+    "svg": ("precision",),
+    "svgz": ("precision",),
+}
+
+
+def output_digest(format="pdf"):
+    # Dependencias de los archivos de salida: además de las de dependencies_digest, el formato y las
+    # opciones de dibujo que cambian el archivo generado.
+    options = {name: render_options[name] for name in output_options[format]}
+    if options.get("backend") == "stream":
+        # El backend "stream" arma el mismo svg que "svg", así que el pdf es el mismo.
+        options["backend"] = "svg"
+    return dependencies_digest() + format + json.dumps(options, sort_keys=True)
+
+
+def load_cache(output_dir):
+    # Lee el manifiesto de la caché: {pdf: {"key": hash de las entradas, "pdf": hash del pdf generado}}.
+    try:
+        with open(os.path.join(output_dir, cache_name), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache, output_dir):
+    # Escribe el manifiesto a un archivo temporal y lo reemplaza, así nunca queda a medio escribir.
+    cache_filename = os.path.join(output_dir, cache_name)
+    tmp_filename = cache_filename + ".tmp"
+    with open(tmp_filename, 'w', encoding='utf-8') as file:
+        json.dump(cache, file, indent=1, sort_keys=True)
+    os.replace(tmp_filename, cache_filename)
+
+
+def cache_entry_name(pdf_filename, output_dir):
+    # Nombre del pdf en el manifiesto, independiente del separador de carpetas del sistema.
+    return os.path.relpath(pdf_filename, output_dir).replace(os.sep, '/')
+
+
+def pending_jobs(jobs, cache, deps, output_dir, force=False):
+    # Calcula la clave de cada trabajo (hash del .asc más las dependencias) y descarta los que ya
+    # tienen un pdf generado con la misma clave y que no fue modificado desde entonces.
+    pending = []
+    for asc_filename, pdf_filename in jobs:
+        key = hashlib.sha256((deps + hash_file(asc_filename)).encode()).hexdigest()
+        entry = cache.get(cache_entry_name(pdf_filename, output_dir))
+        if (not force and entry and entry.get("key") == key and os.path.exists(pdf_filename)
+                and hash_file(pdf_filename) == entry.get("pdf")):
+            # print(f"Saltando {os.path.basename(asc_filename)} (PDF actualizado)")
+            continue
+        pending.append((asc_filename, pdf_filename, key))
+    return pending
+
+
+def init_worker(options=None, instrument=None):
+    # Precalienta cada proceso del pool: importa reportlab y svglib y registra la fuente para que
+    # ningún trabajo pague ese costo.
+    if options:
+        render_options.update(options)
+    if instrument:
+        instrumentation.update(instrument)
+    if instrumentation["report"] and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    load_dependencies()
+    register_fonts()
+
+
+def cache_counters():
+    # Aciertos y fallos acumulados de las cachés de skins y de subconjuntos de la fuente de este proceso.
+    return {"skins": skin_cache.stats(),
+            "font_subsets": font_subset_cache.stats() if font_subset_cache else {"hits": 0, "misses": 0}}
+
+
+def run_job(job):
+    # Ejecuta una conversión y devuelve (asc, error, reporte). Los errores se devuelven como texto para
+    # que el proceso principal los informe sin cortar el resto del lote. El reporte (las mediciones de
+    # cada etapa) es None si no se pidió --report ni --profile. "job" es (asc, pdf, copias), con las copias
+    # como en convert_file.
+    global file_report
+    asc_filename, pdf_filename, copies = job
+    if not (instrumentation["report"] or instrumentation["profile_dir"]):
+        try:
+            convert_file(asc_filename, pdf_filename, copies)
+        except Exception:
+            return asc_filename, traceback.format_exc(), None
+        return asc_filename, None, None
+
+    file_report = {"file": asc_filename, "pid": os.getpid(), "stages": {}}
+    before = cache_counters()
+    start = time.perf_counter()
+    error = None
+    try:
+        convert_file(asc_filename, pdf_filename, copies)
+    except Exception:
+        error = traceback.format_exc()
+    report = file_report
+    file_report = None
+    report["wall_s"] = time.perf_counter() - start
+    report["cache"] = {name: {"hits": counters["hits"] - before[name]["hits"],
+                              "misses": counters["misses"] - before[name]["misses"]}
+                       for name, counters in cache_counters().items()}
+    report["error"] = error is not None
+    return asc_filename, error, report
+
+
+def write_report(filename, reports, converted, cached, copied, elapsed, jobs):
+    # Escribe el reporte de la corrida (--report): las mediciones de cada archivo y los totales por etapa.
+    totals = {}
+    for report in reports:
+        for name, record in report["stages"].items():
+            total = totals.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "peak_bytes": 0})
+            total["wall_s"] += record["wall_s"]
+            total["cpu_s"] += record["cpu_s"]
+            total["peak_bytes"] = max(total["peak_bytes"], record.get("peak_bytes", 0))
+    run = {
+        "version": CONVERTER_VERSION,
+        "options": dict(render_options),
+        "jobs": jobs,
+        # Con tracemalloc activo la conversión es varias veces más lenta: los tiempos sirven para comparar
+        # etapas y archivos entre sí, no como medida absoluta (para eso está bench.py).
+        "tracemalloc": True,
+        "wall_s": elapsed,
+        "files_converted": converted,
+        "files_cached": cached,
+        "files_copied": copied,
+        "stages": totals,
+        "files": sorted(reports, key=lambda report: report["file"]),
+    }
+    with open(filename, 'w', encoding='utf-8') as file:
+        json.dump(run, file, indent=1)
+
+
+def convert_tree(src=input_dir, dst=output_dir, jobs=1, force=False, report=None, profile_dir=None, format="pdf",
+                 **options):
+    # Convierte todos los .asc de "src" (y sus subcarpetas) en pdf dentro de "dst", con la misma estructura
+    # de carpetas y usando la caché de "dst". "jobs" es la cantidad de procesos (0 = todos los núcleos),
+    # "format" es "pdf", "svg" o "svgz" (svg independiente) y las opciones son las de "render_options". Con "report" se escribe en ese archivo un json con las
+    # mediciones de cada etapa y con "profile_dir" se guardan ahí los perfiles de cProfile de cada etapa.
+    # Devuelve la cantidad de archivos convertidos.
+    previous = apply_options(options)
+    previous_instrumentation = dict(instrumentation)
+    instrumentation.update({"report": bool(report), "profile_dir": profile_dir, "input_dir": src})
+    tracing = bool(report) and not tracemalloc.is_tracing()
+    start = time.perf_counter()
+    try:
+        cache = load_cache(dst)
+        all_jobs = collect_jobs(src, dst, format)
+        pending = pending_jobs(all_jobs, cache, output_digest(format), dst, force)
+
+        # Los archivos con el mismo contenido se leen y se dibujan una sola vez; convert_file guarda el
+        # resultado en el pdf de cada uno, con su propio título.
+        groups = {}
+        for asc_filename, pdf_filename, key in pending:
+            groups.setdefault(key, []).append((asc_filename, pdf_filename))
+        batch = [(group[0][0], group[0][1], [pdf_filename for _, pdf_filename in group[1:]])
+                 for group in groups.values()]
+        keys = {group[0][0]: key for key, group in groups.items()}
+
+        n_workers = jobs if jobs > 0 else (os.cpu_count() or 1)
+
+        results = []
+        if n_workers == 1 or len(batch) <= 1:
+            init_worker()
+            for job in batch:
+                print(f"Convirtiendo {os.path.basename(job[0])}...")
+                results.append(run_job(job))
+        else:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            with ProcessPoolExecutor(max_workers=min(n_workers, len(batch)), initializer=init_worker,
+                                     initargs=(dict(render_options), dict(instrumentation))) as pool:
+                futures = []
+                for job in batch:
+                    print(f"Convirtiendo {os.path.basename(job[0])}...")
+                    futures.append(pool.submit(run_job, job))
+                for future in as_completed(futures):
+                    results.append(future.result())
+
+        cant_archivos = 0
+        failed_files.clear()
+        for asc_filename, error, _ in results:
+            if error is not None:
+                print(f"Error al convertir {asc_filename}:\n{error}")
+                failed_files.append(asc_filename)
+                continue
+
+            for copy_asc_filename, copy_pdf_filename in groups[keys[asc_filename]]:
+                if copy_asc_filename != asc_filename:
+                    print(f"Guardado {os.path.relpath(copy_asc_filename, src)} (idéntico a {os.path.relpath(asc_filename, src)})")
+                cache[cache_entry_name(copy_pdf_filename, dst)] = {"key": keys[asc_filename],
+                                                                    "pdf": hash_file(copy_pdf_filename)}
                 cant_archivos += 1
-                print(f"Convirtiendo {file_name}...")
-
-                svg_filename = os.path.join(
-                    root_dir, file_name.replace('.asc', '.svg'))
-                modified_svg_filename = os.path.join(
-                    root_dir, file_name.replace('.asc', '_modified.svg'))
-                fitted_svg_filename = os.path.join(
-                    root_dir, file_name.replace('.asc', '_fitted.svg'))
-                
 
-                # Procesa el archivo .asc
-                wires, lines, components, comments, windowsize = parse_asc_file(asc_filename)
-                create_circuit_svg(svg_filename, wires, lines, components, comments)
-                modify_svg_font(
-                    svg_filename, modified_svg_filename, 'LM_Roman_10')
-                svg_to_pdf(modified_svg_filename, pdf_filename)
+        save_cache(cache, dst)
+
+        if report:
+            write_report(report, [record for _, _, record in results if record is not None], cant_archivos,
+                         len(all_jobs) - len(pending), len(pending) - len(batch), time.perf_counter() - start,
+                         n_workers)
+    finally:
+        render_options.update(previous)
+        instrumentation.update(previous_instrumentation)
+        if tracing:
+            tracemalloc.stop()
+
+    return cant_archivos
+
+
+# Distancia máxima de un comentario al rectángulo para usarlo como nombre de la figura (--regions).
+region_label_distance = 200
+# Largo máximo del nombre de archivo de cada figura, sin la extensión.
+region_name_length = 60
+
+
+def region_name(frame, comments, candidates, number):
+    # Nombre del pdf de la región "frame": el comentario más cercano a su esquina superior izquierda entre los
+    # que están dentro del rectángulo o a menos de "region_label_distance" de él. Si no hay ninguno, el número
+    # del rectángulo en el archivo. "candidates" son los índices de los comentarios que devolvió el índice.
+    x0, y0, x1, y1 = frame
+    best = None
+    for i in candidates:
+        x, y = comments[i]["position"]
+        if max(x0 - x, x - x1, y0 - y, y - y1) > region_label_distance:
+            continue
+        distance = math.dist((x, y), (x0, y0))
+        if best is None or distance < best[0]:
+            best = (distance, comments[i]["text"])
+
+    name = ""
+    if best is not None:
+        # Se quitan los caracteres que no pueden ir en un nombre de archivo.
+        name = " ".join(re.sub(r'[\\/:*?"<>|\x00-\x1f]', ' ', best[1]).split())
+        name = name[:region_name_length].strip(' .')
+    return name or str(number)
+
+
+def sheet_regions(asc_filename):
+    # Lee el .asc una sola vez y separa cada rectángulo en una figura. Lo que toca cada rectángulo sale de
+    # una consulta al índice espacial de la hoja, sin recorrer todos los elementos. Devuelve una lista de
+    # {"name", "frame", "wires", "lines", "components", "comments"} en el orden de los rectángulos.
+    wires, lines, components, comments, rectangles = parse_sheet(asc_filename)
+    wires = normalize_wires(wires)
+    index = build_sheet_index(wires, lines, components, comments)
+
+    regions = []
+    names = set()
+    for number, (x1, y1, x2, y2) in enumerate(rectangles, 1):
+        frame = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        if frame[0] == frame[2] or frame[1] == frame[3]:
+            continue
+        found = index.query(frame)
+        nearby = index.query((frame[0] - region_label_distance, frame[1] - region_label_distance,
+                              frame[2] + region_label_distance, frame[3] + region_label_distance))
+        name = region_name(frame, comments, nearby.get("comments", []), number)
+        if name.lower() in names:
+            name = f"{name} {number}"
+        names.add(name.lower())
+        regions.append({
+            "name": name,
+            "frame": frame,
+            "wires": [wires[i] for i in found.get("wires", [])],
+            "lines": [lines[i] for i in found.get("lines", [])],
+            "components": [components[i] for i in found.get("components", [])],
+            "comments": [comments[i] for i in found.get("comments", [])],
+        })
+    return regions
+
+
+def render_region(job):
+    # Dibuja una región de sheet_regions en su pdf. Devuelve (pdf, error); igual que en run_job, los errores
+    # se devuelven como texto para no cortar el resto de las figuras.
+    global minx
+    global miny
+    global windowsize
+    region, pdf_filename = job
+    try:
+        minx, miny, x1, y1 = region["frame"]
+        windowsize = (x1 - minx, y1 - miny)
+        figure = (region["wires"], region["lines"], region["components"], region["comments"])
+        if render_options["backend"] == "canvas":
+            create_circuit_pdf(*figure, pdf_filename)
+        else:
+            svg_to_pdf(create_circuit_svg(*figure), pdf_filename)
+    except Exception:
+        return pdf_filename, traceback.format_exc()
+    return pdf_filename, None
+
+
+def convert_regions(asc_filename, output_folder=None, jobs=1, **options):
+    # Exporta cada rectángulo del .asc como una figura aparte en "output_folder" (por defecto, una carpeta
+    # con el nombre del .asc dentro de PDFs/). El .asc se lee una sola vez y las figuras se dibujan en
+    # paralelo con "jobs" procesos (0 = todos los núcleos). Devuelve la lista de pdf generados.
+    previous = apply_options(options)
+    try:
+        load_dependencies()
+        regions = sheet_regions(asc_filename)
+        if output_folder is None:
+            output_folder = os.path.join(output_dir, os.path.splitext(os.path.basename(asc_filename))[0])
+        os.makedirs(output_folder, exist_ok=True)
+        batch = [(region, os.path.join(output_folder, region["name"] + ".pdf")) for region in regions]
+        for region in regions:
+            print(f"Exportando {region['name']}...")
+
+        n_workers = jobs if jobs > 0 else (os.cpu_count() or 1)
+        if n_workers == 1 or len(batch) <= 1:
+            init_worker()
+            results = [render_region(job) for job in batch]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=min(n_workers, len(batch)), initializer=init_worker,
+                                     initargs=(dict(render_options),)) as pool:
+                results = list(pool.map(render_region, batch))
+    finally:
+        render_options.update(previous)
+
+    written = []
+    failed_files.clear()
+    for pdf_filename, error in results:
+        if error is not None:
+            print(f"Error al exportar {pdf_filename}:\n{error}")
+            failed_files.append(pdf_filename)
+            continue
+        written.append(pdf_filename)
+    return written
+
+
+# Vistas previas png (--previews): anchos en píxeles de cada vista previa y de la miniatura.
+previews_dir = 'PNGs'
+preview_widths = (480, 1600)
+thumbnail_width = 160
+# En la miniatura se omiten los comentarios y los textos que quedarían más chicos que esto, en píxeles.
+thumbnail_min_text = 6
+# Carpeta (dentro de la de salida) con los png de cada clave, para no volver a rasterizar lo que no cambió.
+previews_store = '.previews'
+
+
+def preview_labels():
+    # Sufijo de cada png de un esquemático ("<nombre>.<sufijo>.png") y su ancho en píxeles.
+    return [(str(width), width) for width in preview_widths] + [("thumb", thumbnail_width)]
+
+
+def drawing_to_png(drawing, width):
+    # Rasteriza el Drawing de reportlab a un png de "width" píxeles de ancho, sobre fondo blanco.
+    return renderPM.drawToString(drawing, fmt='PNG', dpi=72 * width / drawing.width, bg=0xffffff)
+
+
+def render_previews(job):
+    # Genera los png de un .asc en la carpeta de la caché, con el nombre "<clave>.<sufijo>.png". Todas las
+    # vistas previas salen del mismo Drawing; la miniatura, de uno sin comentarios ni textos chicos.
+    # Devuelve (asc, error), con el error como texto igual que en run_job.
+    asc_filename, key, store = job
+    try:
+        load_rasterizer()
+        wires, lines, components, comments = load_circuit(asc_filename)
+        drawing = svg_to_drawing(create_circuit_svg(wires, lines, components, comments))
+        images = {str(width): drawing_to_png(drawing, width) for width in preview_widths}
+
+        thumbnail = create_circuit_svg(wires, lines, components, [],
+                                       min_text_size=thumbnail_min_text * windowsize[0] / thumbnail_width)
+        images["thumb"] = drawing_to_png(svg_to_drawing(thumbnail), thumbnail_width)
+
+        for label, data in images.items():
+            png_filename = os.path.join(store, f"{key}.{label}.png")
+            with open(png_filename + ".tmp", 'wb') as file:
+                file.write(data)
+            os.replace(png_filename + ".tmp", png_filename)
+    except Exception:
+        return asc_filename, traceback.format_exc()
+    return asc_filename, None
+
+
+def create_previews(src=input_dir, dst=previews_dir, jobs=1, force=False, **options):
+    # Genera las vistas previas y la miniatura de cada .asc de "src" en "dst", con la misma estructura de
+    # carpetas. La clave de cada esquemático es el hash del .asc, de las dependencias y de los tamaños: los
+    # png se guardan en "dst/.previews" con esa clave, así un esquemático sin cambios (o igual a otro) nunca
+    # se vuelve a rasterizar. Devuelve la cantidad de esquemáticos rasterizados.
+    previous = apply_options(options)
+    try:
+        load_rasterizer()
+        cache = load_cache(dst)
+        store = os.path.join(dst, previews_store)
+        os.makedirs(store, exist_ok=True)
+        labels = preview_labels()
+        deps = dependencies_digest() + repr(labels) + str(thumbnail_min_text)
+
+        keys = {}
+        batch = {}
+        for asc_filename, pdf_filename in collect_jobs(src, dst):
+            stem = os.path.splitext(pdf_filename)[0]
+            key = hashlib.sha256((deps + hash_file(asc_filename)).encode()).hexdigest()
+            keys[stem] = key
+            stored = all(os.path.exists(os.path.join(store, f"{key}.{label}.png")) for label, _ in labels)
+            if (force or not stored) and key not in batch:
+                batch[key] = (asc_filename, key, store)
+        batch = list(batch.values())
+
+        n_workers = jobs if jobs > 0 else (os.cpu_count() or 1)
+        if n_workers == 1 or len(batch) <= 1:
+            init_worker()
+            results = []
+            for job in batch:
+                print(f"Generando vistas previas de {os.path.basename(job[0])}...")
+                results.append(render_previews(job))
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            for job in batch:
+                print(f"Generando vistas previas de {os.path.basename(job[0])}...")
+            with ProcessPoolExecutor(max_workers=min(n_workers, len(batch)), initializer=init_worker,
+                                     initargs=(dict(render_options),)) as pool:
+                results = list(pool.map(render_previews, batch))
+    finally:
+        render_options.update(previous)
+
+    failed_files.clear()
+    for asc_filename, error in results:
+        if error is not None:
+            print(f"Error al generar las vistas previas de {asc_filename}:\n{error}")
+            failed_files.append(asc_filename)
+    rendered = len(results) - len(failed_files)
+
+    # Los png de cada esquemático se copian desde la caché solo si cambió su clave.
+    new_cache = {}
+    for stem, key in keys.items():
+        name = cache_entry_name(stem, dst)
+        sources = [(os.path.join(store, f"{key}.{label}.png"), f"{stem}.{label}.png") for label, _ in labels]
+        if not all(os.path.exists(stored) for stored, _ in sources):
+            continue
+        if cache.get(name) != key or not all(os.path.exists(png_filename) for _, png_filename in sources):
+            for stored, png_filename in sources:
+                shutil.copyfile(stored, png_filename)
+        new_cache[name] = key
+
+    # Se borran de la caché los png de claves que ya no usa ningún esquemático.
+    used = set(new_cache.values())
+    for file_name in os.listdir(store):
+        if file_name.split('.')[0] not in used:
+            os.remove(os.path.join(store, file_name))
+    save_cache(new_cache, dst)
+    return rendered
+
+
+# Puerto por defecto del servidor de conversiones (--serve / --request).
+server_port = 8765
+# Cantidad de latencias recientes que guarda el servidor para GET /stats.
+server_latencies_size = 1000
+
+
+def render_request(asc, format, options):
+    # Trabajo de un proceso del servidor: convierte y devuelve (bytes, segundos que tardó la conversión),
+    # o (None, motivo) si el .asc no tiene nada que dibujar. El modelo parseado queda en la caché, así que
+    # convert no lo vuelve a leer.
+    start = time.perf_counter()
+    if not any(parse_asc_cached(asc)[:4]):
+        return None, "El .asc no tiene cables, líneas, componentes ni comentarios"
+    data = convert(asc, format, **options)
+    return data, time.perf_counter() - start
+
+
+def query_options(query):
+    # Lee las opciones de dibujo de la consulta de un pedido al servidor. Devuelve (opciones, error), con
+    # error el texto para responder 400 si alguna opción no existe o tiene un valor inválido.
+    options = {}
+    for name, values in query.items():
+        if name == "path":
+            continue
+        if name not in render_options:
+            return None, f"Opción desconocida: {name}"
+        value = values[0]
+        default = render_options[name]
+        if isinstance(default, bool):
+            if value not in ("1", "true", "si", "0", "false", "no"):
+                return None, f"{name} tiene que ser 1 o 0, no '{value}'"
+            value = value in ("1", "true", "si")
+        elif isinstance(default, int):
+            if not value.isdigit():
+                return None, f"{name} tiene que ser un entero no negativo, no '{value}'"
+            value = int(value)
+        elif name == "backend" and value not in backends:
+            return None, f"backend tiene que ser {', '.join(backends)}, no '{value}'"
+        options[name] = value
+    return options, None
+
+
+def query_path(path):
+    # Lee el .asc de "?path=": solo se aceptan archivos .asc dentro de la carpeta de entrada. Igual que las
+    # skins, las rutas relativas salen de la carpeta del programa y no de la carpeta desde la que se inició el
+    # servidor. Devuelve (contenido, status, error), con status y error para responder si no se puede usar.
+    real_path = os.path.realpath(os.path.join(root_dir, path))
+    if not (real_path.startswith(os.path.realpath(os.path.join(root_dir, input_dir)) + os.sep)
+            and real_path.endswith('.asc')):
+        return None, 403, f"Solo se pueden convertir archivos .asc de {input_dir}/"
+    if not os.path.isfile(real_path):
+        return None, 404, f"No existe {path}"
+    with open(real_path, 'rb') as file:
+        return file.read(), 200, None
+
+
+def serve(port=server_port, workers=1):
+    # Servidor http local (solo 127.0.0.1) para integrarlo con editores o con la compilación de LaTeX.
+    # POST /pdf o /svg con el contenido del .asc (o "?path=ASC_Files/archivo.asc") devuelve la figura. Las
+    # opciones de dibujo van en la consulta (?backend=canvas&inline_skins=1); una opción inválida se responde
+    # con 400 y un .asc sin nada que dibujar, con 422. GET /stats devuelve las latencias.
+    # GET /stats resume las últimas "server_latencies_size" latencias.
+    # Las conversiones corren en "workers" procesos que mantienen cargadas la fuente, las skins y los
+    # últimos modelos parseados; si ya hay el doble de pedidos en curso, se responde 503.
+    import http.server
+    import urllib.parse
+    from concurrent.futures import ProcessPoolExecutor
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(dict(render_options),))
+    slots = threading.BoundedSemaphore(2 * workers)
+    # Solo las últimas conversiones, así la memoria no crece mientras el servidor sigue abierto.
+    latencies = deque(maxlen=server_latencies_size)
+    requests = [0]
+    errors = [0]
+
+    class RenderRequestHandler(http.server.BaseHTTPRequestHandler):
+        def do_POST(slf):
+            url = urllib.parse.urlsplit(slf.path)
+            query = urllib.parse.parse_qs(url.query)
+            format = url.path.strip('/')
+            if format not in ("pdf", "svg"):
+                return slf.reply(404, b"Ruta desconocida: usar /pdf o /svg\n")
+
+            options, error = query_options(query)
+            if error is not None:
+                return slf.reply(400, f"{error}\n".encode('utf-8'))
+            if "path" in query:
+                asc, status, error = query_path(query["path"][0])
+                if error is not None:
+                    return slf.reply(status, f"{error}\n".encode('utf-8'))
+            else:
+                length = slf.headers.get("Content-Length", "0")
+                if not length.isdigit():
+                    return slf.reply(400, "Content-Length inválido\n".encode('utf-8'))
+                asc = slf.rfile.read(int(length))
+            if not asc:
+                return slf.reply(400, b"Falta el .asc: mandarlo en el cuerpo del pedido o con ?path=\n")
+
+            if not slots.acquire(blocking=False):
+                return slf.reply(503, b"Servidor ocupado\n")
+            start = time.perf_counter()
+            try:
+                data, render_time = pool.submit(render_request, asc, format, options).result()
+            except Exception:
+                errors[0] += 1
+                return slf.reply(500, traceback.format_exc().encode('utf-8'))
+            finally:
+                slots.release()
+            if data is None:
+                return slf.reply(422, f"{render_time}\n".encode('utf-8'))
+            elapsed = time.perf_counter() - start
+            latencies.append(elapsed)
+            requests[0] += 1
+            print(f"{format} {len(data)} bytes en {elapsed * 1000:.1f} ms (conversión {render_time * 1000:.1f} ms)")
+            slf.reply(200, data, "application/pdf" if format == "pdf" else "image/svg+xml",
+                      {"X-Render-Time": f"{render_time * 1000:.1f}", "X-Total-Time": f"{elapsed * 1000:.1f}"})
+
+        def do_GET(slf):
+            if slf.path != "/stats":
+                return slf.reply(404, b"Ruta desconocida: usar /stats\n")
+            times = sorted(latencies)
+            stats = {"requests": requests[0], "errors": errors[0]}
+            if times:
+                stats.update({
+                    "mean_ms": 1000 * sum(times) / len(times),
+                    "p50_ms": 1000 * times[len(times) // 2],
+                    "p95_ms": 1000 * times[min(len(times) - 1, int(len(times) * 0.95))],
+                    "max_ms": 1000 * times[-1],
+                })
+            slf.reply(200, json.dumps(stats).encode('utf-8'), "application/json")
+
+        def reply(slf, status, data, content_type="text/plain; charset=utf-8", headers=None):
+            slf.send_response(status)
+            slf.send_header("Content-Type", content_type)
+            slf.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                slf.send_header(name, value)
+            slf.end_headers()
+            slf.wfile.write(data)
+
+        def log_message(slf, format, *args):
+            # Cada conversión ya se informa con su latencia.
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), RenderRequestHandler)
+    print(f"Sirviendo en http://127.0.0.1:{port} con {workers} procesos (Ctrl+C para salir)...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.shutdown()
+
+
+def request_render(asc, format="pdf", port=server_port, **options):
+    # Cliente del servidor de conversiones: manda el .asc (ruta o bytes) y devuelve la figura en bytes.
+    # No importa ninguna de las librerías de dibujo, así que arranca rápido.
+    import urllib.parse
+    import urllib.request
+    if not isinstance(asc, (bytes, bytearray)):
+        with open(asc, 'rb') as file:
+            asc = file.read()
+    query = urllib.parse.urlencode({name: int(value) if isinstance(value, bool) else value
+                                    for name, value in options.items()})
+    url = f"http://127.0.0.1:{port}/{format}" + (f"?{query}" if query else "")
+    with urllib.request.urlopen(urllib.request.Request(url, data=bytes(asc), method="POST")) as response:
+        return response.read()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convierte los esquemáticos de LTSpice de ASC_Files/ en figuras pdf.")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="cantidad de procesos en paralelo (0 = todos los núcleos)")
+    parser.add_argument("--force", action="store_true",
+                        help="ignora la caché y vuelve a convertir todos los archivos")
+    parser.add_argument("--inline-skins", action="store_true",
+                        help="define cada skin una vez en <defs> del svg y dibuja los componentes con <use>")
+    parser.add_argument("--backend", choices=backends, default="svg",
+                        help="svg: arma el svg con svgwrite y lo convierte con svglib; stream: igual, pero escribe el "
+                             "svg sin validarlo; canvas: dibuja directamente en el pdf")
+    parser.add_argument("--format", choices=output_formats, default="pdf",
+                        help="pdf, o un svg independiente y compacto para páginas html (svgz: comprimido con gzip)")
+    parser.add_argument("--precision", type=int, default=render_options["precision"],
+                        help="decimales de las coordenadas del svg de --format svg")
+    parser.add_argument("--stable-font-subset", action="store_true",
+                        help="embebe en todas las figuras el mismo subconjunto de la fuente")
+    parser.add_argument("--bundle", metavar="PDF",
+                        help="en lugar de un pdf por archivo, genera un único pdf con una página por esquemático")
+    parser.add_argument("--bundle-folder", metavar="CARPETA", default="",
+                        help="subcarpeta de ASC_Files/ que se incluye en el pdf conjunto (por defecto, todas)")
+    parser.add_argument("--bundle-order", choices=["path", "name", "mtime"], default="path",
+                        help="orden de las páginas: por ruta, por nombre de archivo o por fecha de modificación")
+    parser.add_argument("--regions", metavar="ASC",
+                        help="exporta cada rectángulo del .asc como una figura aparte (en PDFs/<nombre del .asc>/ o en --output)")
+    parser.add_argument("--previews", action="store_true",
+                        help="genera vistas previas png y miniaturas de cada esquemático en PNGs/")
+    parser.add_argument("--watch", action="store_true",
+                        help="queda esperando cambios en ASC_Files/, Skins/ y fonts/ y vuelve a convertir lo que cambió")
+    parser.add_argument("--report", metavar="ARCHIVO.json",
+                        help="escribe un json con el tiempo, la CPU y la memoria de cada etapa de cada archivo")
+    parser.add_argument("--profile", metavar="CARPETA", nargs="?", const="perfiles",
+                        help="guarda los perfiles de cProfile de cada etapa de cada archivo (por defecto en perfiles/)")
+    parser.add_argument("--serve", action="store_true",
+                        help="inicia un servidor local de conversiones en 127.0.0.1 (usa --jobs procesos)")
+    parser.add_argument("--port", type=int, default=server_port,
+                        help=f"puerto del servidor de conversiones (por defecto {server_port})")
+    parser.add_argument("--request", metavar="ASC",
+                        help="pide la conversión de un .asc al servidor y la guarda en --output")
+    parser.add_argument("--output", metavar="ARCHIVO",
+                        help="archivo de salida de --request (.pdf o .svg) o carpeta de --regions")
+    args = parser.parse_args(argv)
+
+    if args.request:
+        # El cliente no carga las librerías de dibujo: solo manda el archivo al servidor.
+        output = args.output or os.path.splitext(args.request)[0] + '.' + args.format
+        format = "svg" if output.endswith(('.svg', '.svgz')) else "pdf"
+        try:
+            data = request_render(args.request, format, args.port, **({"precision": args.precision} if format == "svg" else {}))
+        except OSError as error:
+            # HTTPError y URLError también son OSError: el servidor rechazó el pedido o no está corriendo.
+            detail = error.read().decode('utf-8', 'replace').strip() if hasattr(error, 'read') else ""
+            print(f"Error al convertir {args.request}: {error}" + (f"\n{detail}" if detail else ""))
+            return 1
+        if output.endswith('.svgz'):
+            data = gzip.compress(data, mtime=0)
+        with open(output, 'wb') as file:
+            file.write(data)
+        return 0
+
+    options = {"backend": args.backend, "inline_skins": args.inline_skins,
+               "stable_font_subset": args.stable_font_subset, "precision": args.precision}
+    load_dependencies(install_missing=True)
+
+    if args.serve:
+        apply_options(options)
+        serve(args.port, args.jobs if args.jobs > 0 else (os.cpu_count() or 1))
+        return 0
+
+    if args.regions:
+        written = convert_regions(args.regions, args.output, args.jobs, **options)
+        print("Proceso completado,", len(written), "figuras exportadas.")
+        return 1 if failed_files else 0
+
+    if args.previews:
+        load_rasterizer(install_missing=True)
+        rendered = create_previews(input_dir, previews_dir, args.jobs, args.force, **options)
+        print("Proceso completado,", rendered, "esquemáticos rasterizados.")
+        return 1 if failed_files else 0
+
+    if args.bundle:
+        init_worker(options)
+        pages = create_bundle(
+            collect_bundle_files(os.path.join(input_dir, args.bundle_folder), args.bundle_order), args.bundle)
+        print("Proceso completado,", pages, "páginas en", args.bundle)
+        return 1 if failed_files else 0
+
+    cant_archivos = convert_tree(input_dir, output_dir, args.jobs, args.force, args.report, args.profile, args.format,
+                                 **options)
+
+    print("Proceso completado,",cant_archivos, "archivos convertidos.")
 
-                # Elimina los archivos SVG generados
-                if os.path.exists(svg_filename):
-                    os.remove(svg_filename)
-                if os.path.exists(modified_svg_filename):
-                    os.remove(modified_svg_filename)
+    if args.watch:
+        apply_options(options)
+        init_worker()
+        watch(load_cache(output_dir), input_dir, output_dir, format=args.format)
+    # Código de salida: 0 si todo se convirtió, 1 si algún archivo tuvo errores.
+    return 1 if failed_files else 0
 
 
-print("Proceso completado,",cant_archivos, "archivos convertidos.")
+if __name__ == "__main__":
+    sys.exit(main())
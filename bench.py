@@ -0,0 +1,228 @@
+import os
+import sys
+import io
+import csv
+import json
+import random
+import argparse
+import statistics
+import time
+
+import Main
+
+# Benchmark del conversor: genera esquemáticos sintéticos de distintos tamaños, mide cada etapa de la
+# conversión y compara contra una línea de base guardada. Uso típico:
+#   python bench.py --save bench_baseline.json          (guarda la línea de base)
+#   python bench.py --compare bench_baseline.json       (falla si alguna etapa empeoró más del umbral)
+
+# Tamaños por defecto: cantidad de componentes de cada esquemático sintético.
+default_sizes = [10, 100, 1000]
+
+# Paso de la grilla de LTspice y separación entre componentes en el esquemático sintético.
+grid = 16
+cell = 160
+
+# Orientaciones con las que se colocan los componentes (las de LTspice, incluidas las espejadas).
+orientations = ["R0", "R90", "R180", "R270", "M0", "M90", "M180", "M270"]
+
+# Símbolos cuyo valor tiene un formato propio en LTspice.
+symbol_values = {"Vcc": "V=15"}
+
+
+def generate_asc(components, wires=None, flags=None, comments=None, seed=0):
+    # Devuelve el contenido (str) de un .asc válido con "components" símbolos tomados de
+    # la tabla de símbolos (Skins/Default/symbols.json), "wires" cables, "flags" etiquetas y "comments"
+    # comentarios, todo dentro de un RECTANGLE. Por defecto hay un cable y un comentario cada dos componentes y un flag cada cuatro.
+    # Con la misma semilla el archivo generado es siempre el mismo.
+    rng = random.Random(seed)
+    wires = components if wires is None else wires
+    flags = components // 4 if flags is None else flags
+    comments = components // 2 if comments is None else comments
+
+    symbols = sorted(Main.load_symbol_table())
+    columns = max(1, int(components ** 0.5))
+    rows = max(1, -(-components // columns))
+    width = (columns + 1) * cell
+    height = (rows + 1) * cell
+
+    def point():
+        return rng.randrange(0, width // grid) * grid, rng.randrange(0, height // grid) * grid
+
+    records = ["Version 4", f"SHEET 1 {width} {height}"]
+    endpoints = []
+    for _ in range(wires):
+        # Cables horizontales o verticales, como los que dibuja LTspice.
+        x1, y1 = point()
+        x2, y2 = point()
+        if rng.random() < 0.5:
+            y2 = y1
+        else:
+            x2 = x1
+        records.append(f"WIRE {x1} {y1} {x2} {y2}")
+        endpoints.append((x1, y1))
+
+    for index in range(flags):
+        x, y = endpoints[index % len(endpoints)] if endpoints else point()
+        records.append(f"FLAG {x} {y} {rng.choice(['0', '15V', '-15V', 'Vo', 'Vin'])}")
+
+    for index in range(components):
+        symbol = symbols[index % len(symbols)]
+        x = (index % columns + 1) * cell
+        y = (index // columns + 1) * cell
+        records.append(f"SYMBOL {symbol} {x} {y} {rng.choice(orientations)}")
+        records.append(f"SYMATTR InstName X{index}")
+        records.append(f"SYMATTR Value {symbol_values.get(symbol, f'{rng.randrange(1, 1000)}k')}")
+
+    for index in range(comments):
+        x, y = point()
+        records.append(f"TEXT {x} {y} Left 2 ;Comentario {index}")
+
+    records.append(f"RECTANGLE Normal {width} {height} 0 0 2")
+    return "\n".join(records) + "\n"
+
+
+def time_stages(data, backend):
+    # Convierte una vez el .asc (en bytes) y devuelve {etapa: segundos}.
+    times = {}
+
+    start = time.perf_counter()
+    wires, lines, components, comments, Main.windowsize = Main.parse_asc_file(data)
+    times["parse_asc_file"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    wires = Main.normalize_wires(wires)
+    times["normalize_wires"] = time.perf_counter() - start
+
+    output = io.BytesIO()
+    if backend == "canvas":
+        start = time.perf_counter()
+        Main.create_circuit_pdf(wires, lines, components, comments, output)
+        times["create_circuit_pdf"] = time.perf_counter() - start
+    else:
+        start = time.perf_counter()
+        dwg = Main.create_circuit_svg(wires, lines, components, comments)
+        times["create_circuit_svg"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        Main.svg_to_pdf(dwg, output)
+        times["svg_to_pdf"] = time.perf_counter() - start
+    times["total"] = sum(times.values())
+    return times
+
+
+def run_benchmark(sizes, repeat=3, backend="svg", seed=0):
+    # Mide cada tamaño "repeat" veces y se queda con la mediana de cada etapa.
+    # Devuelve una lista de filas {"size", "stage", "seconds"}.
+    Main.apply_options({"backend": backend})
+    Main.register_fonts()
+
+    results = []
+    for size in sizes:
+        data = generate_asc(size, seed=seed).encode('utf-8')
+        # La primera conversión carga las skins en la caché del proceso: no se mide.
+        time_stages(data, backend)
+        samples = [time_stages(data, backend) for _ in range(repeat)]
+        for stage in samples[0]:
+            seconds = statistics.median(sample[stage] for sample in samples)
+            results.append({"size": size, "stage": stage, "seconds": seconds})
+            print(f"{size:>6} {stage:<20} {seconds * 1000:10.2f} ms")
+    return results
+
+
+def save_results(results, filename, backend):
+    # Guarda los resultados en json o, si el nombre termina en .csv, en csv (con el backend en cada fila).
+    if filename.endswith('.csv'):
+        with open(filename, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=["backend", "size", "stage", "seconds"])
+            writer.writeheader()
+            writer.writerows(dict(row, backend=backend) for row in results)
+    else:
+        with open(filename, 'w') as file:
+            json.dump({"backend": backend, "python": sys.version.split()[0], "results": results}, file, indent=1)
+
+
+def load_results(filename):
+    # Devuelve (backend, resultados) de una corrida guardada con save_results. El backend es None en los
+    # csv guardados antes de que tuvieran esa columna.
+    if filename.endswith('.csv'):
+        with open(filename, newline='') as file:
+            rows = list(csv.DictReader(file))
+        return (rows[0].get("backend") if rows else None,
+                [{"size": int(row["size"]), "stage": row["stage"], "seconds": float(row["seconds"])} for row in rows])
+    with open(filename) as file:
+        data = json.load(file)
+    return data.get("backend"), data["results"]
+
+
+def compare_results(results, baseline, threshold=0.2, minimum=0.002):
+    # Devuelve (regresiones, faltantes). Las regresiones son las etapas que tardaron más de (1 + threshold)
+    # veces lo de la línea de base; las que duran menos de "minimum" segundos se ignoran, porque ahí domina
+    # el ruido de la medición. Las faltantes son las (tamaño, etapa) de la línea de base que no se midieron
+    # en esta corrida, para los tamaños que sí se midieron.
+    reference = {(row["size"], row["stage"]): row["seconds"] for row in baseline}
+    regressions = []
+    for row in results:
+        before = reference.get((row["size"], row["stage"]))
+        if before is None or max(before, row["seconds"]) < minimum:
+            continue
+        if row["seconds"] > before * (1 + threshold):
+            regressions.append((row["size"], row["stage"], before, row["seconds"]))
+    measured = {(row["size"], row["stage"]) for row in results}
+    sizes = {size for size, _ in measured}
+    missing = sorted(key for key in reference if key[0] in sizes and key not in measured)
+    return regressions, missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide el tiempo de cada etapa de la conversión con esquemáticos sintéticos.")
+    parser.add_argument("--sizes", default=",".join(map(str, default_sizes)),
+                        help="cantidades de componentes separadas por comas (por defecto %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="repeticiones por tamaño (se usa la mediana)")
+    parser.add_argument("--backend", choices=Main.backends, default="svg")
+    parser.add_argument("--seed", type=int, default=0, help="semilla del generador de esquemáticos")
+    parser.add_argument("--save", metavar="ARCHIVO", help="guarda los resultados (.json o .csv)")
+    parser.add_argument("--compare", metavar="ARCHIVO", help="línea de base contra la que se comparan los resultados")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="empeoramiento relativo permitido antes de fallar (por defecto %(default)s = 20%%)")
+    parser.add_argument("--write-asc", metavar="CARPETA",
+                        help="solo escribe los esquemáticos sintéticos en CARPETA, sin medir nada")
+    args = parser.parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    if args.write_asc:
+        os.makedirs(args.write_asc, exist_ok=True)
+        for size in sizes:
+            with open(os.path.join(args.write_asc, f"sintetico_{size}.asc"), 'w') as file:
+                file.write(generate_asc(size, seed=args.seed))
+        return 0
+
+    if args.compare:
+        # Se verifica antes de medir: las etapas de un backend no son comparables con las de otro.
+        baseline_backend, baseline = load_results(args.compare)
+        if baseline_backend is None:
+            print(f"{args.compare} no indica el backend: se supone que es {args.backend}.")
+        elif baseline_backend != args.backend:
+            print(f"La línea de base {args.compare} se midió con --backend {baseline_backend}, no con {args.backend}.")
+            return 1
+
+    results = run_benchmark(sizes, args.repeat, args.backend, args.seed)
+    if args.save:
+        save_results(results, args.save, args.backend)
+
+    if args.compare:
+        regressions, missing = compare_results(results, baseline, args.threshold)
+        for size, stage, before, after in regressions:
+            print(f"Regresión: {stage} con {size} componentes pasó de {before * 1000:.2f} ms a {after * 1000:.2f} ms")
+        for size, stage in missing:
+            print(f"Falta: {stage} con {size} componentes está en la línea de base pero no se midió")
+        not_measured = sorted({row["size"] for row in baseline} - set(sizes))
+        if not_measured:
+            print(f"No se midieron los tamaños {', '.join(map(str, not_measured))} de la línea de base.")
+        if regressions or missing:
+            return 1
+        print("Sin regresiones.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import os
+import shutil
+
+import Main
+
+
+def make_tree(tmp_path, names=("ejemplo.asc",)):
+    # Carpeta de entrada con copias de ASC_Files/ejemplo.asc y carpeta de salida vacía.
+    src = tmp_path / "ASC_Files"
+    src.mkdir()
+    for name in names:
+        shutil.copyfile(os.path.join(Main.root_dir, "ASC_Files", "ejemplo.asc"), src / name)
+    return str(src), str(tmp_path / "PDFs")
+
+
+def test_watch_keeps_cache_when_only_unused_skins_change(tmp_path, monkeypatch):
+    src, dst = make_tree(tmp_path)
+    assert Main.convert_tree(src, dst) == 1
+    asc_filename = os.path.join(src, "ejemplo.asc")
+    used = Main.skins_by_file[asc_filename]
+    unused = next(os.path.join(Main.skins_dir, name) for name in sorted(os.listdir(Main.skins_dir))
+                  if name.endswith(".svg") and os.path.join(Main.skins_dir, name) not in used)
+
+    # Cambia una skin que ejemplo.asc no usa: el pdf sigue siendo válido, pero la clave de la caché cambia.
+    monkeypatch.setattr(Main, "dependencies_digest", lambda: "skins modificadas")
+    cache = Main.load_cache(dst)
+    assert Main.rerender_changed({unused}, cache, src, dst) == (0, True)
+    Main.save_cache(cache, dst)
+    assert Main.convert_tree(src, dst) == 0
+
+
+def test_unchanged_files_are_skipped(tmp_path):
+    src, dst = make_tree(tmp_path)
+    assert Main.convert_tree(src, dst) == 1
+    assert Main.convert_tree(src, dst) == 0
+    assert Main.convert_tree(src, dst, force=True) == 1
+
+
+def test_output_options_invalidate_the_cache(tmp_path):
+    src, dst = make_tree(tmp_path)
+    assert Main.convert_tree(src, dst) == 1
+    assert Main.convert_tree(src, dst, backend="canvas") == 1
+    assert Main.convert_tree(src, dst, backend="canvas") == 0
+    assert Main.convert_tree(src, dst, backend="canvas", inline_skins=True) == 1
+    assert Main.convert_tree(src, dst, backend="canvas", inline_skins=True, stable_font_subset=True) == 1
+    # La precisión solo cambia el svg independiente.
+    assert Main.convert_tree(src, dst, backend="canvas", inline_skins=True, stable_font_subset=True, precision=3) == 0
+    assert Main.convert_tree(src, dst, format="svg") == 1
+    assert Main.convert_tree(src, dst, format="svg", precision=3) == 1
+    assert Main.convert_tree(src, dst, format="svg", precision=3) == 0
+
+
+def test_edited_asc_is_converted_again(tmp_path):
+    src, dst = make_tree(tmp_path)
+    assert Main.convert_tree(src, dst) == 1
+    with open(os.path.join(src, "ejemplo.asc"), 'ab') as file:
+        file.write(b"TEXT 0 0 Left 2 ;nuevo\n")
+    assert Main.convert_tree(src, dst) == 1
+
+
+def test_identical_files_are_drawn_once_with_their_own_title(tmp_path, monkeypatch):
+    src, dst = make_tree(tmp_path, ("ejemplo.asc", "copia.asc", "otra copia.asc"))
+    loads = []
+    load_circuit = Main.load_circuit
+    monkeypatch.setattr(Main, "load_circuit", lambda asc: loads.append(asc) or load_circuit(asc))
+    assert Main.convert_tree(src, dst) == 3
+    assert len(loads) == 1
+    for name in ("ejemplo", "copia", "otra copia"):
+        with open(os.path.join(dst, name + ".pdf"), 'rb') as file:
+            assert f"/Title ({name}.pdf)".encode() in file.read()
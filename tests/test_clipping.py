@@ -0,0 +1,52 @@
+import random
+
+import Main
+
+FRAME = (0, 0, 100, 60)
+
+
+def inside(point, frame=FRAME):
+    return frame[0] <= point[0] <= frame[2] and frame[1] <= point[1] <= frame[3]
+
+
+def point_at(start, end, t):
+    return start[0] + t * (end[0] - start[0]), start[1] + t * (end[1] - start[1])
+
+
+def test_clip_segment_matches_sampling():
+    # Liang-Barsky contra muestrear el segmento: los puntos dentro del marco son los de [t0, t1].
+    rng = random.Random(0)
+    samples = [i / 200 for i in range(201)]
+    for _ in range(500):
+        start = (rng.randrange(-50, 150), rng.randrange(-50, 110))
+        end = (rng.randrange(-50, 150), rng.randrange(-50, 110))
+        clipped = Main.clip_segment(start, end, FRAME)
+        for t in samples:
+            point = point_at(start, end, t)
+            # Cerca del borde decide el redondeo del muestreo: solo se verifican los puntos claros.
+            margin = (FRAME[0] + 1e-6, FRAME[1] + 1e-6, FRAME[2] - 1e-6, FRAME[3] - 1e-6)
+            if inside(point, margin):
+                assert clipped is not None and clipped[0] - 1e-9 <= t <= clipped[1] + 1e-9
+            elif not inside(point):
+                assert clipped is None or not clipped[0] + 1e-9 < t < clipped[1] - 1e-9
+        if clipped is not None:
+            assert 0 <= clipped[0] <= clipped[1] <= 1
+            loose = (FRAME[0] - 1e-9, FRAME[1] - 1e-9, FRAME[2] + 1e-9, FRAME[3] + 1e-9)
+            assert inside(point_at(start, end, clipped[0]), loose) and inside(point_at(start, end, clipped[1]), loose)
+
+
+def test_clip_segment_edge_cases():
+    assert Main.clip_segment((10, 10), (90, 50), FRAME) == (0, 1)
+    assert Main.clip_segment((-20, 30), (120, 30), FRAME) == (20 / 140, 120 / 140)
+    assert Main.clip_segment((-20, 80), (120, 80), FRAME) is None
+    # Paralelo al borde, justo sobre él: queda dentro.
+    assert Main.clip_segment((-20, 0), (120, 0), FRAME) == (20 / 140, 120 / 140)
+    assert Main.clip_segment((150, 30), (120, 30), FRAME) is None
+
+
+def test_clip_polyline_splits_pieces_that_leave_the_frame():
+    points = [(-20, 10), (50, 10), (50, 90), (80, 90), (80, 30)]
+    assert Main.clip_polyline(points, FRAME) == [[(0, 10), (50, 10), (50, 60)], [(80, 60), (80, 30)]]
+    # Sobre el borde se dibuja; un tramo que solo toca una esquina, no.
+    assert Main.clip_polyline([(-20, 60), (120, 60)], FRAME) == [[(0, 60), (100, 60)]]
+    assert Main.clip_polyline([(100, -20), (100, 0), (130, 0)], FRAME) == []
@@ -0,0 +1,45 @@
+import os
+
+import Main
+
+
+def test_query_path_accepts_asc_files_of_the_input_folder(monkeypatch, tmp_path):
+    # La ruta relativa sale de la carpeta del programa, no de la carpeta actual.
+    monkeypatch.chdir(tmp_path)
+    data, status, error = Main.query_path("ASC_Files/ejemplo.asc")
+    assert (status, error) == (200, None)
+    with open(os.path.join(Main.root_dir, "ASC_Files", "ejemplo.asc"), 'rb') as file:
+        assert data == file.read()
+    assert Main.query_path(os.path.join(Main.root_dir, "ASC_Files", "ejemplo.asc"))[1] == 200
+
+
+def test_query_path_rejects_files_outside_the_input_folder():
+    for path in ("/etc/passwd", "ASC_Files/../Main.py", "Main.py", "../ASC_Files/ejemplo.asc",
+                 "ASC_Files/../../ejemplo.asc", "ASC_Files", "Skins/Default/symbols.json"):
+        data, status, error = Main.query_path(path)
+        assert data is None and status == 403, path
+
+
+def test_query_path_rejects_links_out_of_the_input_folder(monkeypatch, tmp_path):
+    # Un enlace dentro de ASC_Files/ que apunta afuera se resuelve antes de validar la ruta.
+    input_folder = tmp_path / "ASC_Files"
+    input_folder.mkdir()
+    (tmp_path / "secreto.asc").write_text("Version 4\n")
+    os.symlink(tmp_path / "secreto.asc", input_folder / "enlace.asc")
+    monkeypatch.setattr(Main, "root_dir", str(tmp_path))
+    assert Main.query_path("ASC_Files/enlace.asc")[1] == 403
+
+
+def test_query_path_missing_file():
+    data, status, error = Main.query_path("ASC_Files/no_existe.asc")
+    assert data is None and status == 404
+
+
+def test_query_options_validates_values():
+    assert Main.query_options({"backend": ["canvas"], "inline_skins": ["1"], "precision": ["3"],
+                               "path": ["ASC_Files/ejemplo.asc"]}) == (
+        {"backend": "canvas", "inline_skins": True, "precision": 3}, None)
+    for query in ({"precision": ["abc"]}, {"precision": ["-1"]}, {"backend": ["foo"]},
+                  {"inline_skins": ["quizas"]}, {"color": ["1"]}):
+        options, error = Main.query_options(query)
+        assert options is None and error, query
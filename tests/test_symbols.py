@@ -0,0 +1,48 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+import Main
+
+# Hashes de las skins y los textos que dibujaban las subclases de Component que reemplazó symbols.json,
+# para cada símbolo y cada variante de VARIANTS (None: la subclase fallaba con ese valor).
+with open(os.path.join(os.path.dirname(__file__), "symbols_baseline.json"), encoding="utf-8") as file:
+    BASELINE = json.load(file)
+
+ORIENTATIONS = ["R0", "R90", "R180", "R270", "M0", "M90", "M180", "M270"]
+# Ventanas y valor de cada variante: las ventanas por defecto con un valor numérico (se agrega la unidad),
+# todas las alineaciones y un valor con "=" (Vcc).
+VARIANTS = [
+    ([], "10"),
+    (["WINDOW 0 10 20 Left 2", "WINDOW 3 0 0 Right 2", "WINDOW 123 5 5 VTop 2", "WINDOW 39 -8 40 VBottom 2"], "4.7u"),
+    (["WINDOW 3 -20 30 VLeft 2"], "V=5"),
+]
+
+
+def symbol_sheet(name, windows, value):
+    # Una fila con el símbolo en las 8 orientaciones, dentro del rectángulo.
+    records = ["Version 4", "SHEET 1 4000 1200", "RECTANGLE Normal -400 -400 3600 400"]
+    for column, orientation in enumerate(ORIENTATIONS):
+        records.append(f"SYMBOL {name} {column * 400} 0 {orientation}")
+        records += windows
+        records += [f"SYMATTR InstName X{column}", f"SYMATTR Value {value}", "SYMATTR Value2 Avol=1",
+                    "SYMATTR SpiceLine Rout=1"]
+    return ("\n".join(records) + "\n").encode()
+
+
+@pytest.mark.parametrize("name", sorted(BASELINE))
+def test_symbol_table_matches_old_subclasses(name, monkeypatch):
+    monkeypatch.setitem(Main.render_options, "backend", "svg")
+    for (windows, value), expected in zip(VARIANTS, BASELINE[name]):
+        if expected is None:
+            continue
+        dwg = Main.create_circuit_svg(*Main.load_circuit(symbol_sheet(name, windows, value)), inline_skins=False)
+        xml = [element.tostring() for element in dwg.elements
+               if getattr(element, 'elementname', None) in ('text', 'image')]
+        assert hashlib.sha256("\n".join(xml).encode()).hexdigest()[:16] == expected, (name, value)
+
+
+def test_every_symbol_has_a_baseline():
+    assert sorted(Main.load_symbol_table()) == sorted(BASELINE)
@@ -0,0 +1,110 @@
+import random
+
+import Main
+
+
+def junction_points(wires):
+    # Puntos que llevan un nodo dibujado (grado 3 o más) después de normalizar los cables.
+    wires = Main.normalize_wires(wires)
+    return {point for point, degree in Main.find_junctions(wires, Main.build_wire_index(wires)).items() if degree >= 3}
+
+
+def test_overlapping_collinear_wires_have_no_junctions():
+    assert junction_points([((0, 0), (160, 0)), ((80, 0), (240, 0))]) == set()
+    assert Main.normalize_wires([((0, 0), (160, 0)), ((80, 0), (240, 0))]) == [((0, 0), (240, 0))]
+
+
+def test_contained_collinear_wire_has_no_junctions():
+    assert junction_points([((0, 0), (160, 0)), ((0, 0), (80, 0))]) == set()
+    assert junction_points([((0, 160), (0, 0)), ((0, 40), (0, 120))]) == set()
+    assert Main.normalize_wires([((0, 160), (0, 0)), ((0, 40), (0, 120))]) == [((0, 160), (0, 0))]
+
+
+def test_touching_wires_are_not_merged():
+    wires = [((0, 0), (80, 0)), ((80, 0), (160, 0)), ((80, 0), (80, 80))]
+    assert Main.normalize_wires(wires) == wires
+    assert junction_points(wires) == {(80, 0)}
+
+
+def test_t_junction_on_merged_wire():
+    assert junction_points([((0, 0), (160, 0)), ((0, 0), (80, 0)), ((80, 0), (80, 80))]) == {(80, 0)}
+
+
+def wire_chains(wires):
+    wires = Main.normalize_wires(wires)
+    return Main.merge_wire_chains(wires, Main.find_junctions(wires, Main.build_wire_index(wires)))
+
+
+def test_chains_skip_overlapping_sub_segments():
+    # El tramo (80, 0)-(160, 0) está dentro del primer cable: la cadena sigue de largo hasta (160, 80).
+    assert wire_chains([((0, 0), (160, 0)), ((80, 0), (160, 0)), ((160, 0), (160, 80))]) == [
+        [(0, 0), (160, 0), (160, 80)]]
+    assert wire_chains([((0, 0), (160, 0)), ((80, 0), (240, 0)), ((240, 0), (240, 80))]) == [
+        [(0, 0), (240, 0), (240, 80)]]
+
+
+def test_chains_join_collinear_wires():
+    assert wire_chains([((0, 0), (80, 0)), ((80, 0), (160, 0)), ((160, 0), (160, 80))]) == [
+        [(0, 0), (160, 0), (160, 80)]]
+
+
+def brute_force_degrees(wires):
+    # Grado de cada extremo revisando todos los cables: cada extremo que llega suma 1 y cada cable
+    # horizontal o vertical que lo contiene en su interior suma 2.
+    ends = [point for wire in wires for point in wire]
+    degrees = {}
+    for point in set(ends):
+        degree = ends.count(point)
+        for (x1, y1), (x2, y2) in wires:
+            if x1 != x2 and y1 != y2:
+                continue
+            inside = min(x1, x2) <= point[0] <= max(x1, x2) and min(y1, y2) <= point[1] <= max(y1, y2)
+            if inside and point not in ((x1, y1), (x2, y2)):
+                degree += 2
+        degrees[point] = degree
+    return degrees
+
+
+def random_wires(rng, count):
+    # Cables en una grilla chica, así hay muchos cruces, "T", superposiciones y repetidos.
+    wires = []
+    for _ in range(count):
+        x, y = rng.randrange(0, 10) * 16, rng.randrange(0, 10) * 16
+        kind = rng.random()
+        if kind < 0.45:
+            wires.append(((x, y), (rng.randrange(0, 10) * 16, y)))
+        elif kind < 0.9:
+            wires.append(((x, y), (x, rng.randrange(0, 10) * 16)))
+        else:
+            wires.append(((x, y), (rng.randrange(0, 10) * 16, rng.randrange(0, 10) * 16)))
+    return wires
+
+
+def covered_points(wires):
+    # Puntos de la grilla que tocan los cables horizontales y verticales (los de largo cero no se dibujan).
+    points = set()
+    for (x1, y1), (x2, y2) in wires:
+        if (x1, y1) == (x2, y2):
+            continue
+        if x1 == x2:
+            points.update((x1, y) for y in range(min(y1, y2), max(y1, y2) + 1, 16))
+        elif y1 == y2:
+            points.update((x, y1) for x in range(min(x1, x2), max(x1, x2) + 1, 16))
+    return points
+
+
+def test_junctions_match_brute_force():
+    rng = random.Random(0)
+    for _ in range(200):
+        wires = Main.normalize_wires(random_wires(rng, rng.randrange(1, 40)))
+        assert Main.find_junctions(wires, Main.build_wire_index(wires)) == brute_force_degrees(wires)
+
+
+def test_normalize_keeps_the_drawn_wires():
+    rng = random.Random(1)
+    for _ in range(200):
+        wires = random_wires(rng, rng.randrange(1, 40))
+        normalized = Main.normalize_wires(wires)
+        assert covered_points(normalized) == covered_points(wires)
+        assert {tuple(sorted(wire)) for wire in normalized if wire[0][0] != wire[1][0] and wire[0][1] != wire[1][1]} == \
+            {tuple(sorted(wire)) for wire in wires if wire[0][0] != wire[1][0] and wire[0][1] != wire[1][1]}